@@ -9,10 +9,18 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     
     # JWT Settings
-    JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "change-this-secret-key-in-production")
+    JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
     
+    # Password hashing (argon2id for new hashes, bcrypt kept for legacy ones)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "2"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "19456"))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "1"))
+    # Hashing processes per uvicorn worker (the image runs one worker per core)
+    HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", "1"))
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -29,6 +37,9 @@ class Settings(BaseSettings):
         "http://auth-service:8006"
     )
     
+    # Uploads forwarded to the orchestrator concurrently
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+    
     # Database (if gateway needs direct DB access)
     DATABASE_URL: str = os.getenv(
         "DATABASE_URL",
@@ -3,7 +3,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Dict
 from ..utils.jwt_utils import verify_token
 
-security = HTTPBearer()
+# Single bearer scheme shared by every protected route
+security = HTTPBearer(auto_error=True)
 
 
 async def get_current_user(
@@ -25,9 +26,10 @@ async def get_current_user(
         
         # Extract user info
         user_id = payload.get("user_id")
-        email = payload.get("sub")
+        email = payload.get("email") or payload.get("sub")
         
-        if not user_id or not email:
+        # Tokens issued before the email claim existed stay valid
+        if not user_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token payload",
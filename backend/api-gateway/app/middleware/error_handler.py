@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 import logging
 import httpx
@@ -13,7 +13,7 @@ def add_error_handlers(app: FastAPI):
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
         """Handle HTTP exceptions"""
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code,
             content={
                 "error": exc.detail,
@@ -24,7 +24,7 @@ def add_error_handlers(app: FastAPI):
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
         """Handle validation errors"""
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=422,
             content={
                 "error": "Validation error",
@@ -36,7 +36,7 @@ def add_error_handlers(app: FastAPI):
     async def httpx_exception_handler(request: Request, exc: httpx.HTTPStatusError):
         """Handle errors from backend services"""
         logger.error(f"Backend service error: {exc}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.response.status_code,
             content={
                 "error": "Backend service error",
@@ -49,7 +49,7 @@ def add_error_handlers(app: FastAPI):
     async def general_exception_handler(request: Request, exc: Exception):
         """Handle any other exceptions"""
         logger.error(f"Unhandled exception: {exc}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "error": "Internal server error",
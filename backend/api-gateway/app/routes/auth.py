@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-import httpx
-from ..utils.jwt_utils import create_access_token, hash_password, verify_password
-from ..config import settings
+from functools import lru_cache
+import time
+from ..utils.jwt_utils import create_access_token
+from ..utils.validators import LoginEmail
+from ..middleware.auth_middleware import get_current_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,23 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# Tokens are reused for identical claims within a 5-minute bucket
+TOKEN_CACHE_WINDOW_SECONDS = 300
+
+
+@lru_cache(maxsize=2048)
+def _sign(sub: str, user_id: str, company_name: str, company_ice: str, iat_bucket: int) -> str:
+    """Sign an access token; memoized per claim set and time bucket"""
+    return create_access_token({
+        "sub": sub,
+        "user_id": user_id,
+        "company_name": company_name,
+        "company_ice": company_ice
+    })
+
+
 class LoginRequest(BaseModel):
-    email: EmailStr
+    email: LoginEmail
     password: str
 
 
@@ -48,14 +65,15 @@ async def login(request: LoginRequest):
             "company_ice": "000000000000001"
         }
         
-        token = create_access_token({
-            "sub": request.email,
-            "user_id": user_data["user_id"],
-            "company_name": user_data["company_name"],
-            "company_ice": user_data["company_ice"]
-        })
+        token = _sign(
+            request.email,
+            user_data["user_id"],
+            user_data["company_name"],
+            user_data["company_ice"],
+            int(time.time()) // TOKEN_CACHE_WINDOW_SECONDS
+        )
         
-        logger.info(f"User logged in: {request.email}")
+        logger.info("User logged in: %s", request.email)
         
         return TokenResponse(
             access_token=token,
@@ -96,7 +114,7 @@ async def register(request: RegisterRequest):
         "company_ice": request.company_ice
     })
     
-    logger.info(f"User registered: {request.email}")
+    logger.info("User registered: %s", request.email)
     
     return TokenResponse(
         access_token=token,
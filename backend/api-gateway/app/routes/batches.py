@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import List, Optional
+import asyncio
 from pydantic import BaseModel
 import httpx
+import orjson
 from ..middleware.auth_middleware import get_current_user
 from ..utils.http_client import HTTPClient
 from ..config import settings
@@ -11,8 +15,32 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# HTTP client for orchestrator service
-orchestrator_client = HTTPClient(settings.ORCHESTRATOR_SERVICE_URL, timeout=300.0)
+# HTTP client for orchestrator service (pooled, shared by every handler)
+orchestrator_client = HTTPClient(settings.ORCHESTRATOR_SERVICE_URL, timeout=30.0)
+
+# Per-call override for uploads, processing and exports
+LONG_REQUEST_TIMEOUT = 300.0
+
+# Bounds concurrent upload forwards (memory / open file descriptors)
+upload_slots = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+
+
+@router.on_event("shutdown")
+async def close_orchestrator_client():
+    """Release the pooled orchestrator connections"""
+    await orchestrator_client.aclose()
+
+
+def _as_multipart(files: List[UploadFile]) -> List[tuple]:
+    """Multipart entries referencing each upload's file object (read lazily by httpx)"""
+    for file in files:
+        file.file.seek(0)
+    return [("files", (file.filename, file.file, file.content_type)) for file in files]
+
+
+def _passthrough(status_code: int, body: bytes) -> Response:
+    """Return the orchestrator's JSON bytes as-is (no decode/re-encode)"""
+    return Response(content=body, media_type="application/json", status_code=status_code)
 
 
 class BatchCreateRequest(BaseModel):
@@ -28,19 +56,21 @@ async def create_batch(
 ):
     """Create a new processing batch"""
     try:
-        result = await orchestrator_client.post(
+        status_code, body, _ = await orchestrator_client.request_raw(
+            "POST",
             "/batches",
-            json_data={
+            json={
                 "user_id": user["user_id"],
                 "company_name": request.company_name,
                 "company_ice": request.company_ice,
                 "company_rc": request.company_rc
             }
         )
-        logger.info(f"Batch created: {result.get('batch_id')}")
-        return result
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Batch created: %s", orjson.loads(body).get("batch_id"))
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
-        logger.error(f"Failed to create batch: {e}")
+        logger.error("Failed to create batch: %s", e)
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
 
@@ -51,10 +81,11 @@ async def list_batches(
 ):
     """List all batches for current user"""
     try:
-        result = await orchestrator_client.get(
+        status_code, body, _ = await orchestrator_client.request_raw(
+            "GET",
             f"/users/{user['user_id']}/batches?limit={limit}"
         )
-        return result
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -66,8 +97,8 @@ async def get_batch(
 ):
     """Get batch details"""
     try:
-        result = await orchestrator_client.get(f"/batches/{batch_id}")
-        return result
+        status_code, body, _ = await orchestrator_client.request_raw("GET", f"/batches/{batch_id}")
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -80,25 +111,17 @@ async def upload_invoices(
 ):
     """Upload invoice files"""
     try:
-        # Prepare files for upload
-        files_data = []
-        for file in files:
-            content = await file.read()
-            files_data.append(
-                ("files", (file.filename, content, file.content_type))
+        # Forward to orchestrator; httpx streams the spooled files into the multipart body
+        async with upload_slots:
+            status_code, body, _ = await orchestrator_client.post_files(
+                f"/batches/{batch_id}/upload/invoices",
+                _as_multipart(files),
+                timeout=LONG_REQUEST_TIMEOUT
             )
-        
-        # Forward to orchestrator
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                f"{settings.ORCHESTRATOR_SERVICE_URL}/batches/{batch_id}/upload/invoices",
-                files=files_data
-            )
-            response.raise_for_status()
-            return response.json()
+        return _passthrough(status_code, body)
     
     except httpx.HTTPStatusError as e:
-        logger.error(f"Upload failed: {e}")
+        logger.error("Upload failed: %s", e)
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
 
@@ -110,20 +133,13 @@ async def upload_payments(
 ):
     """Upload payment files"""
     try:
-        files_data = []
-        for file in files:
-            content = await file.read()
-            files_data.append(
-                ("files", (file.filename, content, file.content_type))
-            )
-        
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                f"{settings.ORCHESTRATOR_SERVICE_URL}/batches/{batch_id}/upload/payments",
-                files=files_data
+        async with upload_slots:
+            status_code, body, _ = await orchestrator_client.post_files(
+                f"/batches/{batch_id}/upload/payments",
+                _as_multipart(files),
+                timeout=LONG_REQUEST_TIMEOUT
             )
-            response.raise_for_status()
-            return response.json()
+        return _passthrough(status_code, body)
     
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -136,11 +152,13 @@ async def process_batch(
 ):
     """Start processing the batch"""
     try:
-        result = await orchestrator_client.post(
+        status_code, body, _ = await orchestrator_client.request_raw(
+            "POST",
             f"/batches/{batch_id}/process",
-            json_data={}
+            json={},
+            timeout=LONG_REQUEST_TIMEOUT
         )
-        return result
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -152,8 +170,8 @@ async def get_batch_results(
 ):
     """Get processing results for validation"""
     try:
-        result = await orchestrator_client.get(f"/batches/{batch_id}/results")
-        return result
+        status_code, body, _ = await orchestrator_client.request_raw("GET", f"/batches/{batch_id}/results")
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -169,11 +187,12 @@ async def validate_batch(
         validation_data["user_id"] = user["user_id"]
         validation_data["batch_id"] = batch_id
         
-        result = await orchestrator_client.post(
+        status_code, body, _ = await orchestrator_client.request_raw(
+            "POST",
             f"/batches/{batch_id}/validate",
-            json_data=validation_data
+            json=validation_data
         )
-        return result
+        return _passthrough(status_code, body)
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -185,17 +204,21 @@ async def export_csv(
 ):
     """Export DGI declaration as CSV"""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(
-                f"{settings.ORCHESTRATOR_SERVICE_URL}/batches/{batch_id}/export/csv"
-            )
-            response.raise_for_status()
-            
-            return Response(
-                content=response.content,
-                media_type="text/csv",
-                headers=response.headers
-            )
+        response = await orchestrator_client.stream_get(
+            f"/batches/{batch_id}/export/csv",
+            timeout=LONG_REQUEST_TIMEOUT
+        )
+        return StreamingResponse(
+            response.aiter_raw(chunk_size=65536),
+            media_type="text/csv",
+            headers={
+                "Content-Disposition": response.headers.get(
+                    "Content-Disposition",
+                    f"attachment; filename=DGI_Declaration_{batch_id}.csv"
+                )
+            },
+            background=BackgroundTask(response.aclose)
+        )
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
@@ -1,5 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import Response
+import asyncio
 import httpx
+import orjson
 from ..config import settings
 import logging
 
@@ -7,15 +10,45 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Static payload, encoded once at import
+_HEALTH_RESPONSE = Response(
+    content=orjson.dumps({
+        "status": "healthy",
+        "service": "api-gateway",
+        "version": settings.VERSION
+    }),
+    media_type="application/json"
+)
+
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "api-gateway",
-        "version": settings.VERSION
-    }
+    return _HEALTH_RESPONSE
+
+
+# Shared client for backend probes
+_health_client = httpx.AsyncClient(timeout=5.0)
+
+
+@router.on_event("shutdown")
+async def close_health_client():
+    await _health_client.aclose()
+
+
+async def _probe(service_name: str, url: str):
+    """Probe one backend service's health endpoint"""
+    try:
+        response = await _health_client.get(url)
+        return service_name, {
+            "status": "healthy" if response.status_code == 200 else "unhealthy",
+            "status_code": response.status_code
+        }
+    except Exception as e:
+        return service_name, {
+            "status": "unreachable",
+            "error": str(e)
+        }
 
 
 @router.get("/health/services")
@@ -25,21 +58,10 @@ async def check_backend_services():
         "orchestrator": f"{settings.ORCHESTRATOR_SERVICE_URL}/health",
     }
     
-    results = {}
-    
-    for service_name, url in services.items():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(url)
-                results[service_name] = {
-                    "status": "healthy" if response.status_code == 200 else "unhealthy",
-                    "status_code": response.status_code
-                }
-        except Exception as e:
-            results[service_name] = {
-                "status": "unreachable",
-                "error": str(e)
-            }
+    # Probe all services concurrently
+    results = dict(await asyncio.gather(
+        *(_probe(name, url) for name, url in services.items())
+    ))
     
     all_healthy = all(r["status"] == "healthy" for r in results.values())
     
@@ -1,41 +1,73 @@
 import httpx
-from typing import Optional, Dict, Any
+import orjson
+from typing import Optional, Dict, Any, List, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+async def _log_http_version(response: httpx.Response):
+    """Debug hook: shows whether the orchestrator negotiated HTTP/2"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s -> %s", response.request.method, response.request.url, response.http_version)
+
+
 class HTTPClient:
-    """Reusable HTTP client for calling backend services"""
-    
+    """Reusable HTTP client for calling backend services (one pooled connection set per instance)"""
+
     def __init__(self, base_url: str, timeout: float = 30.0):
         self.base_url = base_url
         self.timeout = timeout
-    
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            # HTTP/2 multiplexes concurrent requests, so a small pool of long-lived connections is enough
+            limits=httpx.Limits(
+                max_connections=20,
+                max_keepalive_connections=20,
+                keepalive_expiry=60
+            ),
+            http2=True,
+            event_hooks={"response": [_log_http_version]}
+        )
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """Send a request on the shared client and decode the JSON body"""
+        logger.info("%s %s%s", method, self.base_url, endpoint)
+        response = await self._client.request(method, endpoint, **kwargs)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    async def request_raw(self, method: str, endpoint: str, **kwargs) -> Tuple[int, bytes, Dict[str, str]]:
+        """Send a request and return (status_code, body, headers) without decoding JSON"""
+        logger.info("%s %s%s", method, self.base_url, endpoint)
+        response = await self._client.request(method, endpoint, **kwargs)
+        response.raise_for_status()
+        return response.status_code, response.content, dict(response.headers)
+
     async def get(self, endpoint: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
         """GET request"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}{endpoint}"
-            logger.info(f"GET {url}")
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-    
+        return await self._request("GET", endpoint, headers=headers)
+
     async def post(
         self,
         endpoint: str,
         json_data: Optional[Dict] = None,
-        files: Optional[Dict] = None,
+        files: Optional[Union[Dict, List]] = None,
         headers: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """POST request"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}{endpoint}"
-            logger.info(f"POST {url}")
-            response = await client.post(url, json=json_data, files=files, headers=headers)
-            response.raise_for_status()
-            return response.json()
-    
+        return await self._request("POST", endpoint, json=json_data, files=files, headers=headers)
+
+    async def post_files(
+        self,
+        endpoint: str,
+        files: Union[Dict, List],
+        timeout: Union[float, httpx.Timeout, None] = httpx.USE_CLIENT_DEFAULT
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """Multipart POST on the shared client; returns (status_code, body, headers) for passthrough"""
+        return await self.request_raw("POST", endpoint, files=files, timeout=timeout)
+
     async def put(
         self,
         endpoint: str,
@@ -43,18 +75,30 @@ class HTTPClient:
         headers: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """PUT request"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}{endpoint}"
-            logger.info(f"PUT {url}")
-            response = await client.put(url, json=json_data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-    
+        return await self._request("PUT", endpoint, json=json_data, headers=headers)
+
     async def delete(self, endpoint: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
         """DELETE request"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}{endpoint}"
-            logger.info(f"DELETE {url}")
-            response = await client.delete(url, headers=headers)
+        return await self._request("DELETE", endpoint, headers=headers)
+
+    async def stream_get(
+        self,
+        endpoint: str,
+        timeout: Union[float, httpx.Timeout, None] = httpx.USE_CLIENT_DEFAULT
+    ) -> httpx.Response:
+        """
+        GET without reading the body; the caller must aclose() the response.
+        Error responses are read and closed before raising.
+        """
+        logger.info("GET (stream) %s%s", self.base_url, endpoint)
+        request = self._client.build_request("GET", endpoint, timeout=timeout)
+        response = await self._client.send(request, stream=True)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
             response.raise_for_status()
-            return response.json()
\ No newline at end of file
+        return response
+
+    async def aclose(self):
+        """Close the underlying connection pool"""
+        await self._client.aclose()
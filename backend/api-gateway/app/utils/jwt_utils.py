@@ -1,10 +1,32 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from jose import JWTError, jwt
+import hashlib
+import threading
+import time
+from cachetools import TTLCache
+import jwt
+from jwt import InvalidTokenError as JWTError
 from passlib.context import CryptContext
 from ..config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Single shared context: new hashes use argon2id, bcrypt hashes still verify
+# and are upgraded on next login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__ident="2b",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM
+)
+
+
+def warm_pwd_context() -> None:
+    """Force passlib to load its hash backends so the first login doesn't pay for it"""
+    pwd_context.hash("warmup")
+    pwd_context.identify("$2b$12$" + "a" * 53)
 
 
 def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -29,14 +51,30 @@ def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+# Decoded payloads keyed by a 16-byte blake2b digest of the token, so repeat
+# requests skip the HMAC + parse without keeping raw tokens in memory
+_token_cache = TTLCache(maxsize=10000, ttl=60)
+_token_cache_lock = threading.Lock()
+
+
 def verify_token(token: str) -> Dict:
     """Verify and decode JWT token"""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+    if cached is not None:
+        payload, exp = cached
+        if time.time() < exp:
+            return payload
+    
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
             algorithms=[settings.JWT_ALGORITHM]
         )
+        with _token_cache_lock:
+            _token_cache[key] = (payload, payload.get("exp", 0))
         return payload
     except JWTError as e:
         raise ValueError(f"Invalid token: {str(e)}")
@@ -0,0 +1,18 @@
+from typing import Annotated
+import re
+
+from pydantic import AfterValidator
+
+# Cheap shape check for login; full EmailStr validation stays on registration
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def check_email(value: str) -> str:
+    """Reject strings that are not shaped like an email address"""
+    if not EMAIL_PATTERN.match(value):
+        raise ValueError("Adresse email invalide")
+    return value
+
+
+# Login email field: a plain str checked against EMAIL_PATTERN
+LoginEmail = Annotated[str, AfterValidator(check_email)]
@@ -1,11 +1,14 @@
-from urllib import request
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from pydantic import BaseModel
-from typing import List, Optional, Set
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
 from .modules.extraction import StructuredExtractor
 from .modules.matching import IntelligentMatcher
 from .services.dgi_formatter import DGIFormatter
@@ -17,14 +20,16 @@ from .schemas.matching import MatchingResult
 from .schemas.legal_result import LegalResult
 from .schemas.dgi_output import DGIDeclaration
 from .utils.config import config
+from .utils.rate_limit import TokenBucketLimiter
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Intelligence Service - DGI Compliance",
     version="1.0.0",
-    description="Complete LLM-based extraction, matching, and legal computation for DGI declarations"
+    description="Complete LLM-based extraction, matching, and legal computation for DGI declarations",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -36,7 +41,18 @@ app.add_middleware(
 )
 
 # Initialize modules
-extractor = StructuredExtractor(api_key=config.ANTHROPIC_API_KEY)
+extractor = StructuredExtractor(
+    api_key=config.ANTHROPIC_API_KEY,
+    cache_size=config.EXTRACT_CACHE_SIZE,
+    disk_cache_path=config.EXTRACT_DISK_CACHE_PATH or None,
+    disk_cache_ttl_seconds=config.EXTRACT_DISK_CACHE_TTL_SECONDS,
+    fast_payment_path=config.EXTRACT_PAYMENT_FAST_PATH,
+    prefilter_ocr=config.EXTRACT_OCR_PREFILTER,
+    rate_limiter=(
+        TokenBucketLimiter(config.LLM_REQUESTS_PER_MINUTE, config.LLM_INPUT_TOKENS_PER_MINUTE or None)
+        if config.LLM_REQUESTS_PER_MINUTE > 0 else None
+    )
+)
 matcher = IntelligentMatcher(amount_tolerance=config.AMOUNT_TOLERANCE)
 rules_service = RulesComputationService(
     penalty_base_rate=config.PENALTY_BASE_RATE,
@@ -46,12 +62,31 @@ formatter = DGIFormatter()
 export_service = ExportService()
 
 
+@app.on_event("startup")
+async def startup():
+    """Size the default executor used by asyncio.to_thread for extraction calls"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=config.EXTRACT_MAX_WORKERS, thread_name_prefix="extract")
+    )
+
+
 # Request/Response models
 class ExtractionRequest(BaseModel):
     ocr_text: str
     document_type: str  # "invoice" or "payment"
 
 
+class BatchExtractionRequest(BaseModel):
+    """Several OCR texts of the same document type, extracted concurrently"""
+    ocr_texts: List[str]
+    document_type: str  # "invoice" or "payment"
+
+class PairExtractionRequest(BaseModel):
+    """An invoice and its payment proof, extracted in one LLM call"""
+    invoice_ocr_text: str
+    payment_ocr_text: str
+
+
 class MatchingRequest(BaseModel):
     invoices: List[InvoiceStruct]
     payments: List[PaymentStruct]
@@ -95,6 +130,26 @@ class HolidayConfigRequest(BaseModel):
     islamic_holidays: List[date]
 
 
+async def parse_body(http_request: Request, model):
+    """
+    Validate the raw request body straight into a model.
+    
+    Used by the large batch endpoints so the JSON is parsed once by
+    pydantic-core instead of json.loads followed by model validation.
+    """
+    try:
+        return model.model_validate_json(await http_request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+def models_response(models) -> ORJSONResponse:
+    """Serialize a model or list of models without re-validating against a response_model"""
+    if isinstance(models, list):
+        return ORJSONResponse([m.model_dump(mode="json") for m in models])
+    return ORJSONResponse(models.model_dump(mode="json"))
+
+
 # Endpoints
 @app.post("/extract/invoice", response_model=InvoiceStruct)
 async def extract_invoice(request: ExtractionRequest):
@@ -110,10 +165,11 @@ async def extract_invoice(request: ExtractionRequest):
         raise HTTPException(status_code=400, detail="OCR text too large (max 100KB)")
     
     try:
-        result = extractor.extract_invoice(request.ocr_text)
+        # Synchronous Anthropic SDK call; run it off the event loop
+        result = await asyncio.to_thread(extractor.extract_invoice, request.ocr_text)
         return result
     except Exception as e:
-        logger.error(f"Invoice extraction failed: {str(e)}")
+        logger.error("Invoice extraction failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -125,13 +181,69 @@ async def extract_payment(request: ExtractionRequest):
         raise HTTPException(status_code=400, detail="document_type must be 'payment'")
 
     try:
-        result = extractor.extract_payment(request.ocr_text)
+        result = await asyncio.to_thread(extractor.extract_payment, request.ocr_text)
         return result
     except Exception as e:
-        logger.error(f"Payment extraction failed: {str(e)}")
+        logger.error("Payment extraction failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/extract/pair")
+async def extract_pair(request: PairExtractionRequest):
+    """Extract an invoice and its payment proof together (single LLM round trip)"""
+    
+    if not request.invoice_ocr_text.strip() or not request.payment_ocr_text.strip():
+        raise HTTPException(status_code=400, detail="OCR text cannot be empty")
+    
+    if len(request.invoice_ocr_text) > 100000 or len(request.payment_ocr_text) > 100000:
+        raise HTTPException(status_code=400, detail="OCR text too large (max 100KB)")
+    
+    try:
+        invoice, payment = await asyncio.to_thread(
+            extractor.extract_invoice_and_payment,
+            request.invoice_ocr_text,
+            request.payment_ocr_text
+        )
+        return ORJSONResponse({
+            "invoice": invoice.model_dump(mode="json"),
+            "payment": payment.model_dump(mode="json")
+        })
+    except Exception as e:
+        logger.error("Invoice+payment extraction failed: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/extract/batch")
+async def extract_batch(request: BatchExtractionRequest):
+    """
+    Extract many documents concurrently with the async Anthropic client.
+    Returns one {"data", "error"} entry per OCR text, in input order.
+    """
+    if request.document_type not in ("invoice", "payment"):
+        raise HTTPException(status_code=400, detail="document_type must be 'invoice' or 'payment'")
+    
+    if len(request.ocr_texts) > 100:
+        raise HTTPException(status_code=400, detail="Maximum 100 documents per batch")
+    
+    if any(len(text) > 100000 for text in request.ocr_texts):
+        raise HTTPException(status_code=400, detail="OCR text too large (max 100KB)")
+    
+    if request.document_type == "invoice":
+        results = await extractor.extract_invoices_batch(request.ocr_texts, config.EXTRACT_BATCH_CONCURRENCY)
+    else:
+        results = await extractor.extract_payments_batch(request.ocr_texts, config.EXTRACT_BATCH_CONCURRENCY)
+    
+    failed = sum(isinstance(result, Exception) for result in results)
+    if failed:
+        logger.error("Batch extraction: %s of %s documents failed", failed, len(results))
+    
+    return [
+        {"data": None, "error": str(result)} if isinstance(result, Exception)
+        else {"data": result.model_dump(mode="json"), "error": None}
+        for result in results
+    ]
+
+
 @app.post("/match", response_model=List[MatchingResult])
 async def match_invoices_payments(request: MatchingRequest):
     """Match invoices to payments with confidence scoring"""
@@ -151,7 +263,7 @@ async def match_invoices_payments(request: MatchingRequest):
         )
         return results
     except Exception as e:
-        logger.error(f"Matching failed: {str(e)}")
+        logger.error("Matching failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -176,16 +288,21 @@ async def compute_legal_rules(request: RulesComputationRequest):
         )
         return result
     except Exception as e:
-        logger.error(f"Legal computation failed: {str(e)}")
+        logger.error("Legal computation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/rules/compute/batch", response_model=List[LegalResult])
-async def compute_legal_rules_batch(request: BatchRulesComputationRequest):
+@app.post(
+    "/rules/compute/batch",
+    responses={200: {"model": List[LegalResult]}}
+)
+async def compute_legal_rules_batch(http_request: Request):
     """
     Batch computation of legal rules for multiple invoices.
     More efficient than calling /rules/compute repeatedly.
     """
+    request = await parse_body(http_request, BatchRulesComputationRequest)
+    
     if len(request.invoices) != len(request.matching_results):
         raise HTTPException(
             status_code=400,
@@ -195,53 +312,40 @@ async def compute_legal_rules_batch(request: BatchRulesComputationRequest):
     if len(request.invoices) > 1000:
         raise HTTPException(status_code=400, detail="Maximum 1000 invoices per batch")
     
-    # Prepare helper sets
-    disputed_set = set(request.disputed_invoices or [])
-    credit_note_set = set(request.credit_notes or [])
-    procedure_690_set = set(request.procedure_690_suppliers or [])
-    
-    # Prepare contractual delays
-    contractual_delays = request.contractual_delays or [None] * len(request.invoices)
-    
-    if len(contractual_delays) != len(request.invoices):
+    if request.contractual_delays is not None and len(request.contractual_delays) != len(request.invoices):
         raise HTTPException(
             status_code=400,
             detail="contractual_delays must have same length as invoices"
         )
     
     try:
-        results = []
-        
-        for i, (invoice, matching, contractual_delay) in enumerate(
-            zip(request.invoices, request.matching_results, contractual_delays)
-        ):
-            is_disputed = invoice.invoice_id in disputed_set
-            is_credit_note = invoice.invoice_id in credit_note_set
-            is_procedure_690 = (invoice.supplier.ice or "") in procedure_690_set
-            
-            result = rules_service.compute_legal_result(
-                invoice=invoice,
-                matching_result=matching,
-                contractual_delay_days=contractual_delay,
-                is_disputed=is_disputed,
-                is_credit_note=is_credit_note,
-                is_procedure_690=is_procedure_690
-            )
-            results.append(result)
+        results = rules_service.compute_legal_results_batch(
+            invoices=request.invoices,
+            matching_results=request.matching_results,
+            contractual_delays=request.contractual_delays,
+            disputed_invoice_ids=request.disputed_invoices,
+            credit_note_ids=request.credit_notes,
+            procedure_690_ices=request.procedure_690_suppliers
+        )
         
-        logger.info(f"Batch computation completed: {len(results)} invoices")
-        return results
+        logger.info("Batch computation completed: %s invoices", len(results))
+        return models_response(results)
         
     except Exception as e:
-        logger.error(f"Batch legal computation failed: {str(e)}")
+        logger.error("Batch legal computation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/dgi/format", response_model=DGIDeclaration)
-async def format_dgi_declaration(request: CompleteDGIRequest):
+@app.post(
+    "/dgi/format",
+    responses={200: {"model": DGIDeclaration}}
+)
+async def format_dgi_declaration(http_request: Request):
     """
     Format complete DGI declaration with all legal computations.
     """
+    request = await parse_body(http_request, CompleteDGIRequest)
+    
     if not (len(request.invoices) == len(request.matching_results) == len(request.legal_results)):
         raise HTTPException(
             status_code=400,
@@ -260,9 +364,12 @@ async def format_dgi_declaration(request: CompleteDGIRequest):
             declaration_month=request.declaration_month,
             activity_sector=request.activity_sector
         )
-        return declaration
+        return Response(
+            content=export_service.export_to_json(declaration),
+            media_type="application/json"
+        )
     except Exception as e:
-        logger.error(f"DGI formatting failed: {str(e)}")
+        logger.error("DGI formatting failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -287,7 +394,7 @@ async def export_dgi_csv(declaration: DGIDeclaration):
             }
         )
     except Exception as e:
-        logger.error(f"CSV export failed: {str(e)}")
+        logger.error("CSV export failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -309,7 +416,7 @@ async def export_alerts_report(declaration: DGIDeclaration):
             }
         )
     except Exception as e:
-        logger.error(f"Alerts report export failed: {str(e)}")
+        logger.error("Alerts report export failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1,4 +1,5 @@
 from .extraction import StructuredExtractor
+from .fast_extraction import FastPaymentExtractor
 from .matching import IntelligentMatcher
 
-__all__ = ["StructuredExtractor", "IntelligentMatcher"]
\ No newline at end of file
+__all__ = ["StructuredExtractor", "FastPaymentExtractor", "IntelligentMatcher"]
\ No newline at end of file
@@ -1,47 +1,30 @@
 import uuid
-from anthropic import Anthropic
-from typing import Any, Dict, List
-import uuid
+from anthropic import Anthropic, AsyncAnthropic
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
 import re
-from tenacity import retry, stop_after_attempt, wait_exponential
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from tenacity import retry, stop_after_attempt, wait_random_exponential
 from ..utils.helper import compute_missing_fields
-import json
 import logging
 from ..schemas.invoice import InvoiceStruct
 from ..schemas.payment import PaymentStruct
+from .fast_extraction import FastPaymentExtractor
+from ..utils.rate_limit import TokenBucketLimiter
 
 logger = logging.getLogger(__name__)
 
 from typing import Any, Dict, List
 
 
-class StructuredExtractor:
-    """
-    Module A: LLM-based extraction of invoices and payments from OCR text.
-    
-    CRITICAL RULES:
-    - Extract ONLY information explicitly present in the text
-    - NEVER infer, calculate, or deduce missing values
-    - For missing fields, return null
-    - Preserve original wording and values exactly as written
-    """
-    
-    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
-        self.client = Anthropic(api_key=api_key)
-        self.model = model
-    
-    @retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    reraise=True
-    )
-    def extract_invoice(self, ocr_text: str) -> InvoiceStruct:
-        """
-        Extract invoice data from OCR text.
-        Returns strictly factual JSON matching invoice_struct schema.
-        """
-        
-        system_prompt = """You are a financial document extraction system for Moroccan invoices.
+# Static system prompts, kept at module level so the text is byte-identical on
+# every call and across workers (required for Anthropic prompt-cache hits)
+SYSTEM_PROMPT_INVOICE = """You are a financial document extraction system for Moroccan invoices.
 
 CRITICAL RULES:
 - Extract ONLY information explicitly present in the text
@@ -60,7 +43,7 @@ MOROCCAN INVOICE TERMINOLOGY:
 - TTC = Toutes Taxes Comprises (including all taxes)
 - BL = Bon de Livraison (delivery note)
 
-You must return valid JSON matching this exact schema:
+Fill the tool input with these fields:
 {
   "supplier": {
     "name": string | null,
@@ -98,85 +81,9 @@ You must return valid JSON matching this exact schema:
   "missing_fields": [string]
 }
 
-Return ONLY the JSON object, no explanations."""
+Answer only through the tool call, with no text outside it."""
 
-        user_prompt = f"""Extract invoice information from this OCR text:
-
-{ocr_text}
-
-Return the structured JSON."""
-
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            
-            content = response.content[0].text
-
-            # Robust JSON extraction
-            content = content.strip()
-            # Remove markdown code fences if present
-            if content.startswith('```'):
-                content = re.sub(r'^```(?:json)?\s*', '', content)
-                content = re.sub(r'\s*```$', '', content)
-
-            # Extract JSON object
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if not json_match:
-                logger.error(f"No valid JSON found in response: {content[:200]}")
-                raise ValueError("LLM did not return valid JSON")
-
-            invoice_data = json.loads(json_match.group())
-            
-            # Generate UUID for invoice
-            invoice_data['invoice_id'] = str(uuid.uuid4())
-            
-            # Validate and return as Pydantic model
-            
-            invoice_data["missing_fields"] = compute_missing_fields(invoice_data)
-            result = InvoiceStruct(**invoice_data)
-
-
-            # Audit logging
-            logger.info(
-                f"Invoice extracted: ID={result.invoice_id}, "
-                f"Supplier={result.supplier.name}, "
-                f"Number={result.invoice.number}, "
-                f"Amount={result.amounts.total_ttc} {result.amounts.currency}, "
-                f"Missing fields={len(result.missing_fields)}"
-            )
-
-            return result
-            
-        except json.JSONDecodeError as e:
-          logger.error(f"Invoice extraction - Invalid JSON: {str(e)}")
-          logger.error(f"LLM Response: {content[:500]}")
-          raise ValueError(f"Failed to parse LLM response as JSON: {str(e)}")
-        
-        except Exception as e:
-          logger.error(f"Invoice extraction failed: {str(e)}", exc_info=True)
-          raise RuntimeError(f"Invoice extraction error: {str(e)}")    
-        
-        
-    @retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    reraise=True
-    )    
-    def extract_payment(self, ocr_text: str) -> PaymentStruct:
-        """
-        Extract payment data from OCR text (bank statement, payment proof).
-        Returns strictly factual JSON matching payment_struct schema.
-        
-        IMPROVED: Better handling of Moroccan bank statements with multiple transactions.
-        """
-        
-        system_prompt = """You are a financial document extraction system for Moroccan payment documents.
+SYSTEM_PROMPT_PAYMENT = """You are a financial document extraction system for Moroccan payment documents.
 
 CRITICAL RULES:
 - Extract ONLY information explicitly present in the text
@@ -232,7 +139,7 @@ DATE PARSING RULES:
 - "27/08/25" → "2025-08-27" (assume 20XX for YY format)
 - Operation date is usually first, value date is second
 
-You must return valid JSON matching this exact schema:
+Fill the tool input with these fields:
 {
   "payer": {
     "name": string | null,
@@ -263,8 +170,295 @@ IMPORTANT FOCUS:
 - Extract the amount from the DEBIT column
 - Convert French number format (space thousands, comma decimal) to standard float
 
-Return ONLY the JSON object, no explanations."""
+Answer only through the tool call, with no text outside it."""
+
+
+def _tool(name: str, description: str, model, exclude: tuple) -> Dict[str, Any]:
+    """
+    Tool definition whose input_schema is the model's JSON schema.
+    
+    Every property is marked required (Optional ones stay nullable), so the
+    LLM emits explicit nulls that compute_missing_fields can report.
+    """
+    schema = model.model_json_schema()
+    for key in exclude:
+        schema["properties"].pop(key, None)
+    for obj in (schema, *schema.get("$defs", {}).values()):
+        if "properties" in obj:
+            obj["required"] = list(obj["properties"])
+    return {"name": name, "description": description, "input_schema": schema}
+
+
+# Forced tool calls: the LLM returns the structured input dict directly, so
+# there is no text to parse. Built once (byte-identical for prompt caching).
+TOOL_INVOICE = _tool(
+    "emit_invoice",
+    "Record the invoice fields extracted from the OCR text.",
+    InvoiceStruct,
+    exclude=("invoice_id", "missing_fields")
+)
+TOOL_PAYMENT = _tool(
+    "emit_payment",
+    "Record the payment fields extracted from the OCR text.",
+    PaymentStruct,
+    exclude=("payment_id",)
+)
+
+
+def _bundle_tool() -> Dict[str, Any]:
+    """One tool carrying both schemas: {"invoice": ..., "payment": ...}."""
+    invoice_schema = dict(TOOL_INVOICE["input_schema"])
+    payment_schema = dict(TOOL_PAYMENT["input_schema"])
+    # Model names don't collide, so both $defs can live at the root
+    defs = {**invoice_schema.pop("$defs", {}), **payment_schema.pop("$defs", {})}
+    return {
+        "name": "emit_invoice_and_payment",
+        "description": "Record the invoice fields and the payment fields extracted from the two OCR texts.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"invoice": invoice_schema, "payment": payment_schema},
+            "required": ["invoice", "payment"],
+            "$defs": defs
+        }
+    }
+
+
+TOOL_BUNDLE = _bundle_tool()
+
+
+# Persistent cache entries are tied to the exact prompt + schema they came
+# from: editing either invalidates older rows
+_PROMPT_VERSIONS = {
+    kind: hashlib.sha256(
+        (prompt + json.dumps(tool, sort_keys=True)).encode("utf-8")
+    ).hexdigest()[:16]
+    for kind, prompt, tool in (
+        ("invoice", SYSTEM_PROMPT_INVOICE, TOOL_INVOICE),
+        ("payment", SYSTEM_PROMPT_PAYMENT, TOOL_PAYMENT),
+    )
+}
+_RESULT_TYPES = {"invoice": InvoiceStruct, "payment": PaymentStruct}
+
+
+class _DiskCache:
+    """
+    SQLite table of extraction results (validated model JSON), so reruns and
+    restarted batches skip the LLM call. Rows older than ttl_seconds are
+    treated as misses.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                "key TEXT PRIMARY KEY, response BLOB NOT NULL, created_at INTEGER NOT NULL)"
+            )
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM extraction_cache WHERE key = ? AND created_at >= ?",
+                (key, int(time.time()) - self.ttl_seconds)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, key: str, response: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, int(time.time()))
+            )
+
+
+# Shared by the sync and async extraction methods. Jittered backoff keeps
+# concurrent batch calls that hit the rate limit together from retrying in
+# lockstep; on the async methods tenacity awaits asyncio.sleep, so a backoff
+# never blocks the event loop.
+_RETRY_POLICY = dict(
+    stop=stop_after_attempt(3),
+    wait=wait_random_exponential(multiplier=1, min=2, max=10),
+    reraise=True
+)
+
+
+# OCR lines worth sending to the LLM: document keywords, dates and amounts
+_OCR_KEEP_RE = re.compile(
+    r'\b(?:ICE|RC|IF|TVA|HT|TTC|MAD|DHS?|TOTAL|FACTURE|AVOIR|BL|LIVRAISON|COMMANDE|'
+    r'ECHEANCE|ÉCHÉANCE|DATE|REF|VIR|VIREMENT|VERS|EMIS|CHEQUE|CHÈQUE|RELEVE|RELEVÉ|SOLDE)\b'
+    r'|\d{2}[ /.-]\d{2}[ /.-]\d{2,4}'
+    r'|\d[\d .]*,\d{2}\b',
+    re.IGNORECASE
+)
+
+
+def _prefilter_ocr(
+    ocr_text: str,
+    context: int = 2,
+    head_lines: int = 10,
+    min_lines: int = 40,
+    min_matches: int = 5
+) -> str:
+    """
+    Drop OCR lines far from anything the extraction needs, to cut prompt tokens.
+    
+    Keeps the first head_lines (letterhead: supplier name, address) and every
+    line within context lines of a keyword/date/amount line; each elided run
+    becomes "[...]". Short texts, and texts with fewer than min_matches
+    relevant lines (unexpected layout), are returned unchanged.
+    """
+    lines = ocr_text.splitlines()
+    if len(lines) <= min_lines:
+        return ocr_text
+    
+    matched = [index for index, line in enumerate(lines) if _OCR_KEEP_RE.search(line)]
+    if len(matched) < min_matches:
+        return ocr_text
+    
+    keep = set(range(min(head_lines, len(lines))))
+    for index in matched:
+        keep.update(range(max(0, index - context), min(len(lines), index + context + 1)))
+    
+    kept_lines = []
+    previous = -1
+    for index in sorted(keep):
+        if index != previous + 1:
+            kept_lines.append("[...]")
+        kept_lines.append(lines[index])
+        previous = index
+    if previous != len(lines) - 1:
+        kept_lines.append("[...]")
+    return "\n".join(kept_lines)
+
+
+def _cached_system(prompt: str) -> List[Dict[str, Any]]:
+    """System block marked for Anthropic prompt caching."""
+    return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def _log_cache_usage(kind: str, response) -> None:
+    """Debug log of prompt-cache reads/writes for one LLM call."""
+    if logger.isEnabledFor(logging.DEBUG):
+        usage = response.usage
+        logger.debug(
+            "%s extraction cache usage: read=%s created=%s input=%s",
+            kind,
+            getattr(usage, "cache_read_input_tokens", None),
+            getattr(usage, "cache_creation_input_tokens", None),
+            usage.input_tokens
+        )
+
+
+class StructuredExtractor:
+    """
+    Module A: LLM-based extraction of invoices and payments from OCR text.
+    
+    CRITICAL RULES:
+    - Extract ONLY information explicitly present in the text
+    - NEVER infer, calculate, or deduce missing values
+    - For missing fields, return null
+    - Preserve original wording and values exactly as written
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-sonnet-4-20250514",
+        cache_size: int = 1024,
+        disk_cache_path: Optional[str] = None,
+        disk_cache_ttl_seconds: int = 30 * 24 * 3600,
+        fast_payment_path: bool = True,
+        prefilter_ocr: bool = True,
+        rate_limiter: Optional[TokenBucketLimiter] = None
+    ):
+        self.client = Anthropic(api_key=api_key)
+        self.aclient = AsyncAnthropic(api_key=api_key)
+        self.model = model
+        # LRU of extraction results keyed by (document type, normalized OCR digest);
+        # re-submitted documents skip the LLM call entirely
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Optional SQLite tier behind the LRU (survives restarts and crashed batches)
+        self._disk_cache = (
+            _DiskCache(disk_cache_path, disk_cache_ttl_seconds) if disk_cache_path else None
+        )
+        # Regex pre-pass answering unambiguous bank statements without the LLM
+        self.fast_payments = FastPaymentExtractor() if fast_payment_path else None
+        # Trim irrelevant OCR lines from the user prompt (fewer input tokens)
+        self.prefilter_ocr = prefilter_ocr
+        # Shared RPM/ITPM budget for every LLM call (sync threads and async batches)
+        self.rate_limiter = rate_limiter
+    
+    @staticmethod
+    def _cache_key(kind: str, ocr_text: str) -> tuple:
+        """SHA-256 of the OCR text with whitespace collapsed (re-OCR spacing noise still hits)."""
+        normalized = " ".join(ocr_text.split())
+        return kind, hashlib.sha256(normalized.encode("utf-8")).digest()
+    
+    def _disk_key(self, key: tuple) -> str:
+        """Persistent key: document type, model, prompt version and OCR digest."""
+        kind, digest = key
+        return f"{kind}:{self.model}:{_PROMPT_VERSIONS[kind]}:{digest.hex()}"
+    
+    def _cache_get(self, key: tuple, id_field: str):
+        """Cached result (memory, then disk) with a fresh document ID, or None."""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        
+        if cached is None and self._disk_cache is not None:
+            stored = self._disk_cache.get(self._disk_key(key))
+            if stored is not None:
+                cached = _RESULT_TYPES[key[0]].model_validate_json(stored)
+                self._cache_put(key, cached, persist=False)
+        
+        if cached is None:
+            return None
+        logger.info("Extraction cache hit (%s)", key[0])
+        return cached.model_copy(update={id_field: str(uuid.uuid4())}, deep=True)
+    
+    def _cache_put(self, key: tuple, result, persist: bool = True) -> None:
+        """Store a successful extraction, evicting the least recently used entry."""
+        if persist and self._disk_cache is not None:
+            self._disk_cache.set(self._disk_key(key), result.model_dump_json().encode("utf-8"))
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _invoice_request(self, ocr_text: str) -> Dict[str, Any]:
+        """Arguments for the invoice messages.create call."""
+        if self.prefilter_ocr:
+            ocr_text = _prefilter_ocr(ocr_text)
+        user_prompt = f"""Extract invoice information from this OCR text:
+
+{ocr_text}
 
+Record the invoice fields in the tool input."""
+
+        return {
+            "model": self.model,
+            "max_tokens": 4096,
+            "system": _cached_system(SYSTEM_PROMPT_INVOICE),
+            "tools": [TOOL_INVOICE],
+            "tool_choice": {"type": "tool", "name": TOOL_INVOICE["name"]},
+            "messages": [
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+    
+    def _payment_request(self, ocr_text: str) -> Dict[str, Any]:
+        """Arguments for the payment messages.create call."""
+        if self.prefilter_ocr:
+            ocr_text = _prefilter_ocr(ocr_text)
         user_prompt = f"""Extract payment information from this OCR text.
 
 This appears to be a bank statement. Focus on finding OUTGOING payments (VIR.EMIS, VIREMENT) to suppliers.
@@ -273,50 +467,298 @@ Look for patterns like "VIR.EMIS WEB VERS [Company]" and extract the payee, amou
 OCR Text:
 {ocr_text}
 
-Return the structured JSON for the most relevant payment transaction."""
+Record the most relevant payment transaction in the tool input."""
+
+        return {
+            "model": self.model,
+            "max_tokens": 2048,
+            "system": _cached_system(SYSTEM_PROMPT_PAYMENT),
+            "tools": [TOOL_PAYMENT],
+            "tool_choice": {"type": "tool", "name": TOOL_PAYMENT["name"]},
+            "messages": [
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+    
+    def _bundle_request(self, invoice_text: str, payment_text: str) -> Dict[str, Any]:
+        """Arguments for the combined invoice + payment messages.create call."""
+        if self.prefilter_ocr:
+            invoice_text = _prefilter_ocr(invoice_text)
+            payment_text = _prefilter_ocr(payment_text)
+        user_prompt = f"""Extract the invoice and its payment from these two OCR texts.
+
+INVOICE OCR Text:
+{invoice_text}
+
+PAYMENT OCR Text (bank statement or payment proof; focus on the OUTGOING payment to the supplier):
+{payment_text}
+
+Record both documents in the tool input."""
+
+        # Both system prompts in one prefix; the cache mark on the last block covers both
+        system = [
+            {"type": "text", "text": SYSTEM_PROMPT_INVOICE},
+            *_cached_system(SYSTEM_PROMPT_PAYMENT)
+        ]
+        return {
+            "model": self.model,
+            "max_tokens": 6144,
+            "system": system,
+            "tools": [TOOL_BUNDLE],
+            "tool_choice": {"type": "tool", "name": TOOL_BUNDLE["name"]},
+            "messages": [
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+    
+    @staticmethod
+    def _estimated_input_tokens(request: Dict[str, Any]) -> int:
+        """Rough input token count of the (uncached) user message: ~4 characters per token."""
+        return sum(len(message["content"]) for message in request["messages"]) // 4
+    
+    @staticmethod
+    def _tool_input(response) -> Dict[str, Any]:
+        """Structured input of the forced tool call."""
+        for block in response.content:
+            if block.type == "tool_use":
+                return block.input
+        logger.error("No tool call in response: stop_reason=%s", response.stop_reason)
+        raise ValueError("LLM did not return a tool call")
+    
+    def _parse_invoice(self, response) -> InvoiceStruct:
+        """Build the InvoiceStruct from an invoice extraction response."""
+        _log_cache_usage("Invoice", response)
+        return self._build_invoice(self._tool_input(response))
+    
+    def _build_invoice(self, invoice_data: Dict[str, Any]) -> InvoiceStruct:
+        """Build the InvoiceStruct from extracted invoice fields."""
+        # Generate UUID for invoice
+        invoice_data['invoice_id'] = str(uuid.uuid4())
+        
+        # Validate and return as Pydantic model
+        invoice_data["missing_fields"] = compute_missing_fields(invoice_data)
+        result = InvoiceStruct.model_validate(invoice_data)
+
+        # Audit logging
+        logger.info(
+            "Invoice extracted: ID=%s, Supplier=%s, Number=%s, Amount=%s %s, Missing fields=%s",
+            result.invoice_id, result.supplier.name, result.invoice.number,
+            result.amounts.total_ttc, result.amounts.currency, len(result.missing_fields)
+        )
+
+        return result
+    
+    def _parse_payment(self, response) -> PaymentStruct:
+        """Build the PaymentStruct from a payment extraction response."""
+        _log_cache_usage("Payment", response)
+        return self._build_payment(self._tool_input(response))
+    
+    def _build_payment(self, payment_data: Dict[str, Any]) -> PaymentStruct:
+        """Build the PaymentStruct from extracted payment fields."""
+        # Generate UUID for payment
+        payment_data['payment_id'] = str(uuid.uuid4())
+        
+        # Validate and return as Pydantic model
+        result = PaymentStruct.model_validate(payment_data)
+
+        # Audit logging
+        logger.info(
+            "Payment extracted: ID=%s, Payee=%s, Amount=%s %s, Date=%s",
+            result.payment_id, result.payee.name,
+            result.amount.value, result.amount.currency, result.dates.operation_date
+        )
 
+        return result
+    
+    @staticmethod
+    def _invoice_error(e: Exception) -> Exception:
+        """Map an invoice extraction failure to the error raised to callers."""
+        logger.error("Invoice extraction failed: %s", e, exc_info=True)
+        return RuntimeError(f"Invoice extraction error: {str(e)}")
+    
+    @staticmethod
+    def _payment_error(e: Exception) -> Exception:
+        """Map a payment extraction failure to the error raised to callers."""
+        logger.error("Payment extraction failed: %s", e)
+        return RuntimeError(f"Payment extraction error: {str(e)}")
+    
+    @retry(**_RETRY_POLICY)
+    def extract_invoice(self, ocr_text: str) -> InvoiceStruct:
+        """
+        Extract invoice data from OCR text.
+        Returns strictly factual JSON matching invoice_struct schema.
+        """
+        key = self._cache_key("invoice", ocr_text)
+        cached = self._cache_get(key, "invoice_id")
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            
-            content = response.content[0].text
-
-            # Robust JSON extraction
-            content = content.strip()
-            if content.startswith('```'):
-                content = re.sub(r'^```(?:json)?\s*', '', content)
-                content = re.sub(r'\s*```$', '', content)
-
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if not json_match:
-                logger.error(f"No valid JSON found in response: {content[:200]}")
-                raise ValueError("LLM did not return valid JSON")
-
-            payment_data = json.loads(json_match.group())
-            
-            # Generate UUID for payment
-            payment_data['payment_id'] = str(uuid.uuid4())
-            
-            # Validate and return as Pydantic model
-            result = PaymentStruct(**payment_data)
-
-            # Audit logging
-            logger.info(
-                f"Payment extracted: ID={result.payment_id}, "
-                f"Payee={result.payee.name}, "
-                f"Amount={result.amount.value} {result.amount.currency}, "
-                f"Date={result.dates.operation_date}"
-            )
-
-            return result
-            
+            request = self._invoice_request(ocr_text)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self._estimated_input_tokens(request))
+            response = self.client.messages.create(**request)
+            result = self._parse_invoice(response)
         except Exception as e:
-            logger.error(f"Payment extraction failed: {str(e)}")
-            raise RuntimeError(f"Payment extraction error: {str(e)}")
-          
\ No newline at end of file
+            raise self._invoice_error(e)
+        
+        self._cache_put(key, result)
+        return result
+        
+        
+    @retry(**_RETRY_POLICY)
+    def extract_payment(self, ocr_text: str) -> PaymentStruct:
+        """
+        Extract payment data from OCR text (bank statement, payment proof).
+        Returns strictly factual JSON matching payment_struct schema.
+        
+        IMPROVED: Better handling of Moroccan bank statements with multiple transactions.
+        """
+        if self.fast_payments is not None:
+            fast = self.fast_payments.extract(ocr_text)
+            if fast is not None:
+                return fast
+        
+        key = self._cache_key("payment", ocr_text)
+        cached = self._cache_get(key, "payment_id")
+        if cached is not None:
+            return cached
+        
+        try:
+            request = self._payment_request(ocr_text)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self._estimated_input_tokens(request))
+            response = self.client.messages.create(**request)
+            result = self._parse_payment(response)
+        except Exception as e:
+            raise self._payment_error(e)
+        
+        self._cache_put(key, result)
+        return result
+    
+    @retry(**_RETRY_POLICY)
+    def _extract_bundle(self, invoice_text: str, payment_text: str) -> Tuple[InvoiceStruct, PaymentStruct]:
+        """Combined LLM call for extract_invoice_and_payment (retried on its own)."""
+        try:
+            request = self._bundle_request(invoice_text, payment_text)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self._estimated_input_tokens(request))
+            response = self.client.messages.create(**request)
+            _log_cache_usage("Invoice+payment", response)
+            bundle = self._tool_input(response)
+            return self._build_invoice(bundle["invoice"]), self._build_payment(bundle["payment"])
+        except Exception as e:
+            logger.error("Invoice+payment extraction failed: %s", e, exc_info=True)
+            raise RuntimeError(f"Invoice+payment extraction error: {str(e)}")
+    
+    def extract_invoice_and_payment(
+        self,
+        invoice_text: str,
+        payment_text: str
+    ) -> Tuple[InvoiceStruct, PaymentStruct]:
+        """
+        Extract an invoice and its payment proof in a single LLM call.
+        
+        The two documents share one request (one round trip, one cached
+        system prefix). A document already answered by the cache or the
+        payment pre-pass is not sent again; the other one then goes
+        through its single-document path. Each path applies the retry
+        policy to its own LLM call.
+        
+        Returns:
+            (invoice, payment)
+        """
+        invoice_key = self._cache_key("invoice", invoice_text)
+        payment_key = self._cache_key("payment", payment_text)
+        invoice = self._cache_get(invoice_key, "invoice_id")
+        payment = self.fast_payments.extract(payment_text) if self.fast_payments is not None else None
+        if payment is None:
+            payment = self._cache_get(payment_key, "payment_id")
+        
+        if invoice is not None and payment is not None:
+            return invoice, payment
+        if invoice is not None:
+            return invoice, self.extract_payment(payment_text)
+        if payment is not None:
+            return self.extract_invoice(invoice_text), payment
+        
+        invoice, payment = self._extract_bundle(invoice_text, payment_text)
+        self._cache_put(invoice_key, invoice)
+        self._cache_put(payment_key, payment)
+        return invoice, payment
+    
+    @retry(**_RETRY_POLICY)
+    async def aextract_invoice(self, ocr_text: str) -> InvoiceStruct:
+        """Async variant of extract_invoice (AsyncAnthropic client)."""
+        key = self._cache_key("invoice", ocr_text)
+        # Cache I/O (SQLite) and validation run in the default executor so
+        # the event loop keeps dispatching the other in-flight batch calls
+        cached = await asyncio.to_thread(self._cache_get, key, "invoice_id")
+        if cached is not None:
+            return cached
+        
+        try:
+            request = self._invoice_request(ocr_text)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(self._estimated_input_tokens(request))
+            response = await self.aclient.messages.create(**request)
+            result = await asyncio.to_thread(self._parse_invoice, response)
+        except Exception as e:
+            raise self._invoice_error(e)
+        
+        await asyncio.to_thread(self._cache_put, key, result)
+        return result
+    
+    @retry(**_RETRY_POLICY)
+    async def aextract_payment(self, ocr_text: str) -> PaymentStruct:
+        """Async variant of extract_payment (AsyncAnthropic client)."""
+        if self.fast_payments is not None:
+            fast = self.fast_payments.extract(ocr_text)
+            if fast is not None:
+                return fast
+        
+        key = self._cache_key("payment", ocr_text)
+        cached = await asyncio.to_thread(self._cache_get, key, "payment_id")
+        if cached is not None:
+            return cached
+        
+        try:
+            request = self._payment_request(ocr_text)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(self._estimated_input_tokens(request))
+            response = await self.aclient.messages.create(**request)
+            result = await asyncio.to_thread(self._parse_payment, response)
+        except Exception as e:
+            raise self._payment_error(e)
+        
+        await asyncio.to_thread(self._cache_put, key, result)
+        return result
+    
+    @staticmethod
+    async def run_batch(extract, texts: List[str], concurrency: int = 20) -> List[Any]:
+        """
+        Run an async extraction over many OCR texts concurrently.
+        
+        Args:
+            extract: Async extraction method (e.g. aextract_invoice)
+            texts: OCR texts
+            concurrency: Max LLM calls in flight (rate-limit control)
+        
+        Returns:
+            Results in input order; a failed document yields its exception
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(text: str):
+            async with semaphore:
+                return await extract(text)
+        
+        return await asyncio.gather(*(run_one(text) for text in texts), return_exceptions=True)
+    
+    async def extract_invoices_batch(self, texts: List[str], concurrency: int = 20) -> List[Any]:
+        """Extract many invoices concurrently (see run_batch)."""
+        return await self.run_batch(self.aextract_invoice, texts, concurrency)
+    
+    async def extract_payments_batch(self, texts: List[str], concurrency: int = 20) -> List[Any]:
+        """Extract many payments concurrently (see run_batch)."""
+        return await self.run_batch(self.aextract_payment, texts, concurrency)
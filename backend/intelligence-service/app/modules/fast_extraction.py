@@ -0,0 +1,105 @@
+from datetime import date
+from typing import Optional
+import re
+import uuid
+import logging
+
+from ..schemas.payment import PaymentStruct
+
+logger = logging.getLogger(__name__)
+
+
+# One outgoing web transfer line of a Moroccan bank statement, e.g.
+# "0016BK 28 08 VIR.EMIS WEB VERS ARIHA SERVICE SAR 27 08 2025 ... 6 300,00"
+# operation day/month, payee, value date, then the rest of the line (amount
+# columns and anything else printed after the value date)
+_TRANSFER_LINE_RE = re.compile(
+    r'(?P<op_day>\d{2})[ /](?P<op_month>\d{2})\s+'
+    r'VIR\.?\s?EMIS\s+WEB\s+VERS\s+'
+    r'(?P<payee>[A-Z0-9][A-Z0-9 .&\'-]*?)\s+'
+    r'(?P<value_day>\d{2})[ /](?P<value_month>\d{2})[ /](?P<value_year>\d{4}|\d{2})\b'
+    r'(?P<tail>.*)$',
+    re.MULTILINE
+)
+# A standalone French-format amount ("6 300,00", "6.300,00"), never started
+# or ended inside another number
+_AMOUNT_RE = re.compile(r'(?<![\d.,])\d{1,3}(?:[ .]\d{3})*,\d{2}(?![\d,])')
+# What may surround the amount: spacing, OCR dot leaders, a currency code
+_TAIL_FILLER_RE = re.compile(r'(?:[\s.]|\b(?:MAD|DHS?)\b)*')
+_CURRENCY_RE = re.compile(r'\b(?:MAD|DHS?)\b')
+
+
+def _parse_amount(text: str) -> float:
+    """French format ("6 300,00", "6.300,00") to float."""
+    return float(text.replace(" ", "").replace(".", "").replace(",", "."))
+
+
+class FastPaymentExtractor:
+    """
+    Deterministic pre-pass for bank statements, run before the LLM.
+
+    Only answers when the statement holds exactly one outgoing web transfer
+    ("VIR.EMIS WEB VERS ...") whose dates and amount all parse, with the
+    amount as the only thing after the value date. Anything ambiguous
+    (several transfers, a balance column, a possible reference, other
+    layouts) returns None so the caller falls back to LLM extraction.
+    Payer, bank, account and reference are not read.
+    """
+
+    def extract(self, ocr_text: str) -> Optional[PaymentStruct]:
+        """
+        Args:
+            ocr_text: OCR text of the payment document
+
+        Returns:
+            PaymentStruct, or None when the text is not unambiguous
+        """
+        transfers = _TRANSFER_LINE_RE.findall(ocr_text)
+        if len(transfers) != 1:
+            return None
+
+        op_day, op_month, payee, value_day, value_month, value_year, tail = transfers[0]
+
+        # Exactly one amount after the value date and nothing else: a second
+        # amount (balance column) or extra text (a possible reference) is
+        # left to the LLM
+        amounts = _AMOUNT_RE.findall(tail)
+        if len(amounts) != 1:
+            return None
+        amount = amounts[0]
+        if not _TAIL_FILLER_RE.fullmatch(tail.replace(amount, " ", 1)):
+            return None
+
+        try:
+            year = int(value_year) if len(value_year) == 4 else 2000 + int(value_year)
+            value_date = date(year, int(value_month), int(value_day))
+            # Operation line carries no year: same year as the value date,
+            # unless the two dates straddle New Year (December/January)
+            op_year = year
+            if int(op_month) == 12 and value_date.month == 1:
+                op_year = year - 1
+            elif int(op_month) == 1 and value_date.month == 12:
+                op_year = year + 1
+            operation_date = date(op_year, int(op_month), int(op_day))
+            amount_value = _parse_amount(amount)
+        except ValueError:
+            return None
+
+        result = PaymentStruct(
+            payment_id=str(uuid.uuid4()),
+            payer={"name": None, "ice": None},
+            payee={"name": payee.strip()},
+            payment={"method": "bank_transfer", "reference": None, "bank": None, "account": None},
+            amount={
+                "value": amount_value,
+                "currency": "MAD" if _CURRENCY_RE.search(ocr_text) else None
+            },
+            dates={"operation_date": operation_date, "value_date": value_date}
+        )
+
+        logger.info(
+            "Payment extracted without LLM: ID=%s, Payee=%s, Amount=%s, Date=%s",
+            result.payment_id, result.payee.name, result.amount.value, result.dates.operation_date
+        )
+
+        return result
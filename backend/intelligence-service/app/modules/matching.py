@@ -1,6 +1,9 @@
-from typing import List, Tuple
-from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 import re
+from rapidfuzz import fuzz
 from ..schemas.invoice import InvoiceStruct
 from ..schemas.payment import PaymentStruct
 from ..schemas.matching import MatchingResult, Match, PaymentStatus
@@ -11,6 +14,144 @@ from ..utils.config import config
 logger = logging.getLogger(__name__)
 
 
+# Columnar rows read once per document, so pair scoring never walks model
+# attribute chains:
+#   payment row: (payment, amount, operation_date, payee_name, payee_lower,
+#                 reference, reference_upper)
+#   invoice row: (amount, issue_date, supplier_lower, number, number_upper)
+PaymentRow = Tuple[PaymentStruct, float, Optional[date], Optional[str], str, Optional[str], str]
+InvoiceRow = Tuple[float, Optional[date], str, Optional[str], str]
+
+
+def _payment_row(payment: PaymentStruct) -> PaymentRow:
+    payee_name = payment.payee.name
+    reference = payment.payment.reference
+    return (
+        payment,
+        payment.amount.value or 0,
+        payment.dates.operation_date,
+        payee_name,
+        (payee_name or "").lower(),
+        reference,
+        str(reference).upper() if reference else ""
+    )
+
+
+def _invoice_row(invoice: InvoiceStruct) -> InvoiceRow:
+    number = invoice.invoice.number
+    return (
+        invoice.amounts.total_ttc or 0,
+        invoice.invoice.issue_date,
+        (invoice.supplier.name or "").lower(),
+        number,
+        str(number).upper() if number else ""
+    )
+
+
+class _PaymentIndex:
+    """
+    Payments sorted by amount and by operation date, built once per matching
+    call, so each invoice only scores payments whose amount/date can still
+    reach the confidence threshold (bisect range lookups instead of a full scan).
+    """
+    
+    # Relative slack on amount band edges so float rounding never drops a candidate
+    _EPS = 1e-9
+    
+    def __init__(self, payment_columns: List[PaymentRow]):
+        self.size = len(payment_columns)
+        
+        by_amount = sorted(
+            (row[1], position)
+            for position, row in enumerate(payment_columns)
+            if row[1] > 0
+        )
+        self._amounts = [amount for amount, _ in by_amount]
+        self._amount_positions = [position for _, position in by_amount]
+        
+        by_date = sorted(
+            (row[2], position)
+            for position, row in enumerate(payment_columns)
+            if isinstance(row[2], date)
+        )
+        self._dates = [payment_date for payment_date, _ in by_date]
+        self._date_positions = [position for _, position in by_date]
+        
+        # Dates the scorer may still accept but that cannot be range-indexed (e.g. strings)
+        self._unindexed_dates = {
+            position
+            for position, row in enumerate(payment_columns)
+            if row[2] and not isinstance(row[2], date)
+        }
+    
+    def _amount_range(self, low: float, high: float) -> Set[int]:
+        start = bisect_left(self._amounts, low * (1 - self._EPS))
+        end = bisect_right(self._amounts, high * (1 + self._EPS))
+        return set(self._amount_positions[start:end])
+    
+    def _date_range(self, low: Optional[date], high: Optional[date]) -> Set[int]:
+        start = 0 if low is None else bisect_left(self._dates, low)
+        end = len(self._dates) if high is None else bisect_right(self._dates, high)
+        return set(self._date_positions[start:end]) | self._unindexed_dates
+    
+    def candidates(
+        self,
+        invoice_amount: float,
+        invoice_date,
+        required_points: float,
+        amount_tolerance: float
+    ) -> List[int]:
+        """
+        Positions of payments whose amount + date points can reach
+        required_points (same tiers as IntelligentMatcher._score_upper_bound),
+        in original payment order.
+        """
+        if required_points <= 0:
+            return list(range(self.size))
+        
+        # Payments earning at least N amount points (nested tiers)
+        amount_sets: Dict[int, Optional[Set[int]]] = {0: None}
+        if invoice_amount > 0:
+            exact = self._amount_range(
+                invoice_amount * (1 - amount_tolerance), invoice_amount * (1 + amount_tolerance)
+            )
+            close = self._amount_range(invoice_amount * 0.95, invoice_amount * 1.05)
+            amount_sets[40] = exact
+            amount_sets[30] = exact | close
+            amount_sets[20] = amount_sets[30] | self._amount_range(0, invoice_amount)
+        
+        # Payments earning at least N date points (nested tiers)
+        date_sets: Dict[int, Optional[Set[int]]] = {0: None}
+        if isinstance(invoice_date, date):
+            date_sets[30] = self._date_range(invoice_date, invoice_date + timedelta(days=180))
+            date_sets[20] = self._date_range(invoice_date, None)
+            date_sets[10] = self._date_range(None, None)
+        elif invoice_date:
+            # Unparsed invoice date: the scorer decides, so any dated payment qualifies
+            date_sets[30] = self._date_range(None, None)
+        
+        selected: Set[int] = set()
+        for amount_points, amount_set in amount_sets.items():
+            # Smallest date tier that completes this amount tier
+            date_points = min(
+                (points for points in date_sets if amount_points + points >= required_points),
+                default=None
+            )
+            if date_points is None:
+                continue
+            date_set = date_sets[date_points]
+            if amount_set is None and date_set is None:
+                return list(range(self.size))
+            if amount_set is None:
+                selected |= date_set
+            elif date_set is None:
+                selected |= amount_set
+            else:
+                selected |= amount_set & date_set
+        
+        return sorted(selected)
+
+
 class IntelligentMatcher:
     """
     Module B: Intelligent matching between invoices and payments.
@@ -19,6 +160,13 @@ class IntelligentMatcher:
     All decisions must be explainable and auditable.
     """
     
+    # Common Moroccan/French legal forms stripped before name comparison
+    _LEGAL_FORMS_RE = re.compile(
+        r'\b(?:sarl|sa|sas|eurl|snc|scs|societe|société|ste|ets|etablissement)\b'
+    )
+    _NONWORD_RE = re.compile(r'[^\w\s]')
+    _DIGITS_RE = re.compile(r'\d+')
+    
     def __init__(self, amount_tolerance: float = 0.01):
         """
         Args:
@@ -49,27 +197,53 @@ class IntelligentMatcher:
                 for invoice in invoices
             ]
         
-        results = []
+        # Payment fields read once per payment instead of once per pair
+        payment_columns = [_payment_row(payment) for payment in payments]
         
-        for invoice in invoices:
-            result = self._match_single_invoice(invoice, payments)
-            results.append(result)
+        payment_index = _PaymentIndex(payment_columns)
         
-        return results
+        return [
+            self._match_single_invoice(invoice, payments, payment_columns, payment_index)
+            for invoice in invoices
+        ]
     
     def _match_single_invoice(
         self,
         invoice: InvoiceStruct,
-        payments: List[PaymentStruct]
+        payments: List[PaymentStruct],
+        payment_columns: Optional[List[PaymentRow]] = None,
+        payment_index: Optional[_PaymentIndex] = None
     ) -> MatchingResult:
         """
         Find all matching payments for a single invoice.
         """
+        if payment_columns is None:
+            payment_columns = [_payment_row(payment) for payment in payments]
+        if payment_index is None:
+            payment_index = _PaymentIndex(payment_columns)
+        
         matches = []
+        # Dates of matched payments, taken from the columns while scoring
+        payment_dates = []
+        min_score = config.MIN_CONFIDENCE_SCORE
+        invoice_columns = _invoice_row(invoice)
+        invoice_amount, invoice_date = invoice_columns[0], invoice_columns[1]
         
-        for payment in payments:
-            score, reasons, matched_amount = self._calculate_match_score(
-                invoice, payment
+        # Name (25) + reference (15) give at most 40 points; amount/date must cover the rest
+        candidate_positions = payment_index.candidates(
+            invoice_amount, invoice_date, min_score - 40, self.amount_tolerance
+        )
+        
+        for position in candidate_positions:
+            payment_columns_row = payment_columns[position]
+            payment, payment_amount, payment_date = payment_columns_row[:3]
+            # Cheap numeric pre-filter: skip pairs that cannot reach the threshold
+            # even with full name and reference points
+            if self._score_upper_bound(invoice_amount, invoice_date, payment_amount, payment_date) < min_score:
+                continue
+            
+            score, reasons, matched_amount = self._score_rows(
+                invoice_columns, payment_columns_row
             )
             
             # Only include matches with sufficient confidence
@@ -80,6 +254,8 @@ class IntelligentMatcher:
                     confidence_score=score,
                     matching_reasons=reasons
                 ))
+                if payment_date:
+                    payment_dates.append(payment_date)
         
         # Sort by confidence score (highest first)
         matches.sort(key=lambda x: x.confidence_score, reverse=True)
@@ -96,17 +272,6 @@ class IntelligentMatcher:
         else:
             status = PaymentStatus.PAID
         
-        # Extract payment dates
-        payment_dates = []
-        for match in matches:
-            payment = next(
-                (p for p in payments if p.payment_id == match.payment_id),
-                None
-            )
-            if payment and payment.dates.operation_date:
-                payment_dates.append(payment.dates.operation_date)
-                
-                
         # Audit logging
         logger.info(
             f"Invoice {invoice.invoice_id} matched: "
@@ -133,6 +298,42 @@ class IntelligentMatcher:
             payment_dates=sorted(payment_dates)
         )
     
+    def _score_upper_bound(
+        self,
+        invoice_amount: float,
+        invoice_date: Optional[date],
+        payment_amount: float,
+        payment_date: Optional[date]
+    ) -> float:
+        """
+        Highest score _calculate_match_score could give this pair.
+        
+        Amount and date rules are computed exactly (pure arithmetic); the
+        name (25) and reference (15) rules are assumed to score in full.
+        """
+        bound = 40.0
+        
+        if invoice_amount > 0 and payment_amount > 0:
+            amount_diff = abs(invoice_amount - payment_amount) / invoice_amount
+            if amount_diff <= self.amount_tolerance:
+                bound += 40
+            elif amount_diff <= 0.05:
+                bound += 30
+            elif payment_amount < invoice_amount:
+                bound += 20
+        
+        if invoice_date and payment_date:
+            try:
+                if payment_date >= invoice_date:
+                    bound += 20
+                if payment_date <= invoice_date + timedelta(days=180):
+                    bound += 10
+            except TypeError:
+                # Non-date values: let the full scorer decide
+                bound += 30
+        
+        return bound
+    
     def _calculate_match_score(
         self,
         invoice: InvoiceStruct,
@@ -144,16 +345,26 @@ class IntelligentMatcher:
         Returns:
             (score, reasons, matched_amount)
         """
+        return self._score_rows(_invoice_row(invoice), _payment_row(payment))
+    
+    def _score_rows(
+        self,
+        invoice_columns: InvoiceRow,
+        payment_columns: PaymentRow
+    ) -> Tuple[float, List[str], float]:
+        """
+        _calculate_match_score on precomputed columns (see _invoice_row and
+        _payment_row); the matching loop calls this once per candidate pair.
+        
+        Returns:
+            (score, reasons, matched_amount)
+        """
+        invoice_amount, issue_date, supplier_name, invoice_number, inv_num = invoice_columns
+        _, payment_amount, operation_date, payee_display, payee_name, reference, pay_ref = payment_columns
+        
         score = 0.0
         reasons = []
-        matched_amount = min(
-            payment.amount.value or 0,
-            invoice.amounts.total_ttc or 0
-        )
-
-        
-        invoice_amount = invoice.amounts.total_ttc or 0
-        payment_amount = payment.amount.value or 0
+        matched_amount = min(payment_amount, invoice_amount)
         
         # Rule 1: Amount matching (40 points)
         if invoice_amount > 0 and payment_amount > 0:
@@ -180,16 +391,13 @@ class IntelligentMatcher:
                 )
         
         # Rule 2: Date validation (20 points)
-      
-        if (invoice.invoice.issue_date and payment.dates.operation_date):
-            
+        if issue_date and operation_date:
             try:
                 # Ensure dates are date objects
-                inv_date = invoice.invoice.issue_date
-                pay_date = payment.dates.operation_date
+                inv_date = issue_date
+                pay_date = operation_date
                 
                 if isinstance(inv_date, str):
-                    from datetime import datetime
                     inv_date = datetime.fromisoformat(inv_date).date()
                 if isinstance(pay_date, str):
                     pay_date = datetime.fromisoformat(pay_date).date()
@@ -208,12 +416,8 @@ class IntelligentMatcher:
             except (ValueError, AttributeError) as e:
                 logger.warning(f"Date validation failed: {e}")
                 reasons.append("Dates invalides - validation impossible")
-                
-                
-        # Rule 3: Supplier/Payee name matching (25 points)
-        supplier_name = (invoice.supplier.name or "").lower()
-        payee_name = (payment.payee.name or "").lower()
         
+        # Rule 3: Supplier/Payee name matching (25 points)
         if supplier_name and payee_name:
             similarity = self._calculate_name_similarity(
                 supplier_name, payee_name
@@ -222,112 +426,104 @@ class IntelligentMatcher:
             if similarity > 0.9:
                 score += 25
                 reasons.append(
-                    f"Bénéficiaire identique: {payment.payee.name}"
+                    f"Bénéficiaire identique: {payee_display}"
                 )
             elif similarity > 0.7:
                 score += 15
                 reasons.append(
-                    f"Bénéficiaire similaire: {payment.payee.name}"
+                    f"Bénéficiaire similaire: {payee_display}"
                 )
         
         # Rule 4: Reference matching (15 points)
-        if invoice.invoice.number and payment.payment.reference:
-            inv_num = str(invoice.invoice.number).upper()
-            pay_ref = str(payment.payment.reference).upper()
-            
+        if inv_num and pay_ref:
             if inv_num in pay_ref:
                 score += 15
                 reasons.append(
-                    f"Référence trouvée: {invoice.invoice.number} "
-                    f"dans {payment.payment.reference}"
+                    f"Référence trouvée: {invoice_number} "
+                    f"dans {reference}"
                 )
             elif self._fuzzy_reference_match(inv_num, pay_ref):
                 score += 10
                 reasons.append(
                     f"Référence partielle: similitude avec "
-                    f"{payment.payment.reference}"
+                    f"{reference}"
                 )
         
         # Rule 5: Reasonable payment window (10 points)
-        if invoice.invoice.issue_date and payment.dates.operation_date:
+        if issue_date and operation_date:
             max_delay = timedelta(days=180)
-            if payment.dates.operation_date <= invoice.invoice.issue_date + max_delay:
+            if operation_date <= issue_date + max_delay:
                 score += 10
                 reasons.append("Paiement dans un délai raisonnable (≤180j)")
- 
         
         return (score, reasons, matched_amount)
     
-    
-    
-    
-    
     def _calculate_name_similarity(self, name1: str, name2: str) -> float:
         """
         Calculate similarity between two company names.
         Handles common variations in Moroccan company names.
+        
+        Uses RapidFuzz token_set_ratio (C++), which tolerates typos and
+        plural forms ("ARIHA SERVICE" vs "ARIHA SERVICES") that a plain
+        token Jaccard misses.
         """
         # Normalize
         name1 = self._normalize_company_name(name1)
         name2 = self._normalize_company_name(name2)
         
+        if not name1 or not name2:
+            return 0.0
+        
         # Exact match
         if name1 == name2:
             return 1.0
         
-        # Token-based similarity
-        tokens1 = set(name1.split())
-        tokens2 = set(name2.split())
-        
-        if not tokens1 or not tokens2:
-            return 0.0
-        
-        intersection = tokens1.intersection(tokens2)
-        union = tokens1.union(tokens2)
-        
-        return len(intersection) / len(union)
+        return fuzz.token_set_ratio(name1, name2) / 100.0
     
-    def _normalize_company_name(self, name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _normalize_company_name(name: str) -> str:
         """
         Normalize company name for comparison.
+        Memoized: the same names recur across the invoice x payment loop.
         """
         name = name.lower().strip()
         
         # Remove common legal forms
-        legal_forms = [
-            'sarl', 'sa', 'sas', 'eurl', 'snc', 'scs',
-            'societe', 'société', 'ste', 'ets', 'etablissement'
-        ]
-        
-        for form in legal_forms:
-            name = re.sub(rf'\b{form}\b', '', name)
+        name = IntelligentMatcher._LEGAL_FORMS_RE.sub('', name)
         
         # Remove special characters
-        name = re.sub(r'[^\w\s]', ' ', name)
+        name = IntelligentMatcher._NONWORD_RE.sub(' ', name)
         
         # Remove extra whitespace
         name = ' '.join(name.split())
         
         return name
     
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _digit_runs(ref: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """
+        (all digit runs, runs of 4+ digits) of a reference.
+        Memoized: each invoice/payment reference recurs across many pairs.
+        """
+        runs = tuple(IntelligentMatcher._DIGITS_RE.findall(ref))
+        return runs, tuple(run for run in runs if len(run) >= 4)
+    
     def _fuzzy_reference_match(self, ref1: str, ref2: str) -> bool:
         """
         Check if references match with tolerance for truncation/noise.
+        
+        True when a digit run of one reference contains a digit run of the
+        other and the containing run has at least 4 digits.
         """
-        # Extract digits
-        digits1 = re.findall(r'\d+', ref1)
-        digits2 = re.findall(r'\d+', ref2)
-        
-        # Check if main numeric part matches
-        if digits1 and digits2:
-            # Find longest common digit sequence
-            for d1 in digits1:
-                for d2 in digits2:
-                    if d1 in d2 or d2 in d1:
-                        if len(d1) >= 4 or len(d2) >= 4:
-                            return True
-        
-        return False
+        digits1, long1 = self._digit_runs(ref1)
+        digits2, long2 = self._digit_runs(ref2)
+        
+        return (
+            any(d1 in d2 for d2 in long2 for d1 in digits1)
+            or any(d2 in d1 for d1 in long1 for d2 in digits2)
+        )
     
     def _create_unpaid_result(self, invoice: InvoiceStruct) -> MatchingResult:
         """
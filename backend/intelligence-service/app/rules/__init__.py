@@ -2,10 +2,12 @@ from .payment_terms import PaymentTermsEngine
 from .penalties import PenaltyEngine
 from .status import StatusEngine
 from .holiday_calendar import MoroccanHolidayCalendar
+from .alert_collector import AlertCollector
 
 __all__ = [
     "PaymentTermsEngine",
     "PenaltyEngine",
     "StatusEngine",
-    "MoroccanHolidayCalendar"
+    "MoroccanHolidayCalendar",
+    "AlertCollector"
 ]
\ No newline at end of file
@@ -0,0 +1,34 @@
+from typing import Iterable, List
+
+from ..schemas.alerts import Alert
+
+
+class AlertCollector:
+    """
+    Per-invoice sink for alerts and computation notes.
+    
+    One collector is threaded through the rules pipeline instead of
+    building and concatenating intermediate alert/note lists.
+    """
+    
+    __slots__ = ("alerts", "notes")
+    
+    def __init__(self):
+        self.alerts: List[Alert] = []
+        self.notes: List[str] = []
+    
+    def emit(self, alert: Alert) -> None:
+        """Record one alert"""
+        self.alerts.append(alert)
+    
+    def emit_all(self, alerts: Iterable[Alert]) -> None:
+        """Record alerts returned by an engine step"""
+        self.alerts.extend(alerts)
+    
+    def note(self, note: str) -> None:
+        """Record one computation note"""
+        self.notes.append(note)
+    
+    def note_all(self, notes: Iterable[str]) -> None:
+        """Record notes returned by an engine step"""
+        self.notes.extend(notes)
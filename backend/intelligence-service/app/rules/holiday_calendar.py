@@ -1,6 +1,8 @@
-from datetime import date, timedelta
+from datetime import date
 from typing import Set
 
+_MAX_ORDINAL = date.max.toordinal()
+
 
 class MoroccanHolidayCalendar:
     """
@@ -23,6 +25,10 @@ class MoroccanHolidayCalendar:
         (11, 18): "Fête de l'Indépendance",
     }
     
+    # Widest span (in years) kept in the business-day bitmap. A date further
+    # away starts a fresh span instead of stretching the current one
+    MAX_LOADED_YEARS = 50
+    
     def __init__(self, islamic_holidays: Set[date] = None):
         """
         Args:
@@ -32,6 +38,103 @@ class MoroccanHolidayCalendar:
         """
         self.islamic_holidays = islamic_holidays or set()
     
+    @property
+    def islamic_holidays(self) -> Set[date]:
+        return self._islamic_holidays
+    
+    @islamic_holidays.setter
+    def islamic_holidays(self, value: Set[date]) -> None:
+        # Reset the ordinal tables whenever the holiday set is replaced
+        self._islamic_holidays = value
+        self._closed_ordinals = {d.toordinal() for d in value}
+        self._loaded_years: Set[int] = set()
+        self._loaded_from = 0
+        self._loaded_until = -1
+        self._bitmap_base = 0
+        self._business_bitmap = bytearray()
+        # Build the bitmap for the configured years up front, so lookups
+        # don't trigger incremental rebuilds
+        if value:
+            self._load_range(min(value).toordinal(), max(value).toordinal())
+    
+    def _expand_fixed_holidays(self, first_year: int, last_year: int) -> None:
+        """Add the fixed holidays (as ordinals) of every year not expanded yet."""
+        for year in range(first_year, last_year + 1):
+            if year not in self._loaded_years:
+                self._closed_ordinals.update(
+                    date(year, month, day).toordinal()
+                    for month, day in self.FIXED_HOLIDAYS
+                )
+                self._loaded_years.add(year)
+    
+    def _mark_business_days(self, first_ordinal: int, last_ordinal: int) -> None:
+        """
+        Set the bitmap bits of the business days between the two ordinals.
+        Ordinal % 7 is 6 on Saturdays and 0 on Sundays.
+        """
+        closed = self._closed_ordinals
+        bitmap = self._business_bitmap
+        base = self._bitmap_base
+        for ordinal in range(first_ordinal, last_ordinal + 1):
+            if ordinal % 7 not in (0, 6) and ordinal not in closed:
+                index = ordinal - base
+                bitmap[index >> 3] |= 1 << (index & 7)
+    
+    def _load_range(self, first_ordinal: int, last_ordinal: int) -> None:
+        """
+        Make sure the business-day bitmap covers every year between the two
+        ordinals (one bit per day, set on business days).
+        
+        The loaded span stays contiguous: nearby years are prepended or
+        appended and only those new days are computed. A span that would
+        exceed MAX_LOADED_YEARS is replaced by the requested years instead.
+        """
+        if self._loaded_from <= first_ordinal and last_ordinal <= self._loaded_until:
+            return
+        # Lookaheads near date.max must not run past the last representable day
+        last_ordinal = min(last_ordinal, _MAX_ORDINAL)
+        first_year = date.fromordinal(first_ordinal).year
+        last_year = date.fromordinal(last_ordinal).year
+        
+        if self._loaded_from <= self._loaded_until:
+            union_first_year = min(first_year, date.fromordinal(self._loaded_from).year)
+            union_last_year = max(last_year, date.fromordinal(self._loaded_until).year)
+            if union_last_year - union_first_year < self.MAX_LOADED_YEARS:
+                self._expand_fixed_holidays(union_first_year, union_last_year)
+                
+                new_from = date(union_first_year, 1, 1).toordinal()
+                if new_from < self._loaded_from:
+                    # The base stays a multiple of 8, so prepending is whole bytes
+                    new_base = new_from & ~7
+                    self._business_bitmap[0:0] = bytes((self._bitmap_base - new_base) >> 3)
+                    self._bitmap_base = new_base
+                    old_from, self._loaded_from = self._loaded_from, new_from
+                    self._mark_business_days(new_from, old_from - 1)
+                
+                new_until = date(union_last_year, 12, 31).toordinal()
+                if new_until > self._loaded_until:
+                    size = ((new_until - self._bitmap_base) >> 3) + 1
+                    self._business_bitmap.extend(bytes(size - len(self._business_bitmap)))
+                    old_until, self._loaded_until = self._loaded_until, new_until
+                    self._mark_business_days(old_until + 1, new_until)
+                return
+        
+        # Nothing loaded yet, or too far from the loaded span: start afresh
+        self._expand_fixed_holidays(first_year, last_year)
+        self._loaded_from = date(first_year, 1, 1).toordinal()
+        self._loaded_until = date(last_year, 12, 31).toordinal()
+        self._bitmap_base = self._loaded_from & ~7
+        self._business_bitmap = bytearray(((self._loaded_until - self._bitmap_base) >> 3) + 1)
+        self._mark_business_days(self._loaded_from, self._loaded_until)
+    
+    def _is_business_ordinal(self, ordinal: int) -> bool:
+        """
+        Business-day test on a proleptic ordinal: one bitmap probe.
+        The ordinal must lie inside the loaded span (see _load_range).
+        """
+        index = ordinal - self._bitmap_base
+        return bool(self._business_bitmap[index >> 3] & (1 << (index & 7)))
+    
     def is_weekend(self, d: date) -> bool:
         """Check if date is Saturday or Sunday"""
         return d.weekday() in (5, 6)
@@ -49,38 +152,40 @@ class MoroccanHolidayCalendar:
         Check if date is a business day.
         Returns False for weekends and holidays.
         """
-        return not (
-            self.is_weekend(d) or 
-            self.is_fixed_holiday(d) or 
-            self.is_islamic_holiday(d)
-        )
+        ordinal = d.toordinal()
+        self._load_range(ordinal, ordinal)
+        return self._is_business_ordinal(ordinal)
     
     def next_business_day(self, d: date) -> date:
         """
         Get the next business day after given date.
         If date is already a business day, return it.
         """
-        current = d
+        ordinal = d.toordinal()
+        self._load_range(ordinal, ordinal + 30)
         
         # Safety limit to prevent infinite loops
         max_iterations = 30
         iterations = 0
         
-        while not self.is_business_day(current) and iterations < max_iterations:
-            current += timedelta(days=1)
+        while not self._is_business_ordinal(ordinal) and iterations < max_iterations:
+            ordinal += 1
             iterations += 1
         
         if iterations >= max_iterations:
             # Fallback: just skip weekends
-            while current.weekday() in (5, 6):
-                current += timedelta(days=1)
+            while ordinal % 7 in (0, 6):
+                ordinal += 1
         
-        return current
+        return date.fromordinal(ordinal)
     
     def add_business_days(self, start_date: date, days: int) -> date:
         """
         Add business days to a date, skipping weekends and holidays.
         
+        Walks integer ordinals rather than date objects; the date is only
+        rebuilt once at the end.
+        
         Args:
             start_date: Starting date
             days: Number of business days to add
@@ -88,15 +193,18 @@ class MoroccanHolidayCalendar:
         Returns:
             Resulting date
         """
-        current = start_date
+        ordinal = start_date.toordinal()
+        self._load_range(ordinal, ordinal + 2 * days + 31)
         days_added = 0
         
         while days_added < days:
-            current += timedelta(days=1)
-            if self.is_business_day(current):
+            ordinal += 1
+            if ordinal > self._loaded_until:
+                self._load_range(ordinal, ordinal + 366)
+            if self._is_business_ordinal(ordinal):
                 days_added += 1
         
-        return current
+        return date.fromordinal(ordinal)
     
     @classmethod
     def create_for_year(cls, year: int, islamic_holidays: Set[date] = None):
@@ -107,4 +215,6 @@ class MoroccanHolidayCalendar:
             year: Year to create calendar for
             islamic_holidays: Islamic holidays for that year
         """
-        return cls(islamic_holidays=islamic_holidays or set())
\ No newline at end of file
+        calendar = cls(islamic_holidays=islamic_holidays or set())
+        calendar._load_range(date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal())
+        return calendar
\ No newline at end of file
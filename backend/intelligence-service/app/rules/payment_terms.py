@@ -1,14 +1,58 @@
 from datetime import date, timedelta
-from typing import Optional, Tuple, List
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, List
 import logging
 
 from ..schemas.invoice import InvoiceStruct
-from ..schemas.alerts import Alert, AlertCode, AlertSeverity
+from ..schemas.alerts import Alert, AlertCode, AlertSeverity, ALERT_TEMPLATES, alert_with_message
 from .holiday_calendar import MoroccanHolidayCalendar
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _applied_delay(
+    contractual_delay_days: Optional[int],
+    default_delay_days: int,
+    max_delay_days: int,
+    collect_notes: bool
+) -> Tuple[int, Tuple[Alert, ...], Tuple[str, ...]]:
+    """
+    Memoized core of PaymentTermsEngine.compute_applied_delay.
+    
+    Pure function of its arguments; returns immutable tuples so cached
+    results (and the frozen alerts inside) can be shared safely.
+    """
+    # No contractual agreement (None or 0 means use default legal delay)
+    if contractual_delay_days is None or contractual_delay_days == 0:
+        notes = (
+            f"Aucun délai contractuel stipulé. "
+            f"Application du délai légal par défaut: {default_delay_days} jours.",
+        )
+        return default_delay_days, (), notes if collect_notes else ()
+    
+    # Contractual delay within legal limit
+    if contractual_delay_days <= max_delay_days:
+        notes = (
+            f"Délai contractuel appliqué: {contractual_delay_days} jours "
+            f"(≤ maximum légal de {max_delay_days} jours).",
+        )
+        return contractual_delay_days, (), notes if collect_notes else ()
+    
+    # Contractual delay exceeds maximum - cap it
+    alert = alert_with_message(
+        AlertCode.CONTRACTUAL_DELAY_EXCEEDS_MAX,
+        f"Délai contractuel ({contractual_delay_days} jours) "
+        f"dépasse le maximum légal ({max_delay_days} jours). "
+        f"Application du plafond légal."
+    )
+    notes = (
+        f"Délai contractuel demandé: {contractual_delay_days} jours. "
+        f"Plafonné au maximum légal: {max_delay_days} jours.",
+    )
+    return max_delay_days, (alert,), notes if collect_notes else ()
+
+
 class PaymentTermsEngine:
     """
     Compute legal payment terms according to Moroccan DGI regulations.
@@ -20,16 +64,40 @@ class PaymentTermsEngine:
     - Start date: delivery_date OR issue_date (with alert)
     """
     
+    __slots__ = ("calendar", "collect_notes", "_due_date_table")
+    
     # Legal constants
     DEFAULT_LEGAL_DELAY_DAYS = 60
     MAX_CONTRACTUAL_DELAY_DAYS = 120
     
-    def __init__(self, calendar: MoroccanHolidayCalendar = None):
+    # Window of raw due dates with a precomputed business-day adjustment
+    DUE_DATE_TABLE_PAST_DAYS = 730
+    DUE_DATE_TABLE_FUTURE_DAYS = 365
+    
+    def __init__(self, calendar: MoroccanHolidayCalendar = None, collect_notes: bool = True):
         """
         Args:
             calendar: Holiday calendar for business day calculations
+            collect_notes: Build the French computation notes (skip for bulk runs)
         """
         self.calendar = calendar or MoroccanHolidayCalendar()
+        self.collect_notes = collect_notes
+        self.refresh_due_date_table()
+    
+    def refresh_due_date_table(self) -> None:
+        """
+        Precompute raw → business-day-adjusted due dates around today.
+        
+        Call again after changing the calendar's holidays; dates outside
+        the window fall back to calendar.next_business_day.
+        """
+        first_day = date.today() - timedelta(days=self.DUE_DATE_TABLE_PAST_DAYS)
+        total_days = self.DUE_DATE_TABLE_PAST_DAYS + self.DUE_DATE_TABLE_FUTURE_DAYS
+        next_business_day = self.calendar.next_business_day
+        self._due_date_table: Dict[date, date] = {
+            day: next_business_day(day)
+            for day in (first_day + timedelta(days=offset) for offset in range(total_days + 1))
+        }
     
     def compute_legal_start_date(
         self,
@@ -49,48 +117,34 @@ class PaymentTermsEngine:
             (legal_start_date, alerts)
         """
         alerts = []
+        header = invoice.invoice
+        delivery_date = header.delivery_date
+        issue_date = header.issue_date
         
         # Priority 1: Delivery date
-        if invoice.invoice.delivery_date:
+        if delivery_date:
             logger.info(
-                f"Invoice {invoice.invoice_id}: Using delivery_date "
-                f"as legal start: {invoice.invoice.delivery_date}"
+                "Invoice %s: Using delivery_date as legal start: %s",
+                invoice.invoice_id, delivery_date
             )
-            return invoice.invoice.delivery_date, alerts
+            return delivery_date, alerts
         
         # Priority 2: Issue date (with alert)
-        if invoice.invoice.issue_date:
-            alerts.append(Alert(
-                code=AlertCode.MISSING_DELIVERY_DATE,
-                severity=AlertSeverity.WARNING,
-                message=(
-                    "Date de livraison manquante. "
-                    "Utilisation de la date de facture par défaut. "
-                    "Vérification manuelle recommandée."
-                ),
-                field="invoice.delivery_date"
-            ))
+        if issue_date:
+            alerts.append(ALERT_TEMPLATES[AlertCode.MISSING_DELIVERY_DATE])
             
             logger.warning(
-                f"Invoice {invoice.invoice_id}: Missing delivery_date, "
-                f"using issue_date: {invoice.invoice.issue_date}"
+                "Invoice %s: Missing delivery_date, using issue_date: %s",
+                invoice.invoice_id, issue_date
             )
             
-            return invoice.invoice.issue_date, alerts
+            return issue_date, alerts
         
         # No date available - CRITICAL
-        alerts.append(Alert(
-            code=AlertCode.MISSING_ISSUE_DATE,
-            severity=AlertSeverity.CRITICAL,
-            message=(
-                "Aucune date disponible (livraison ni facture). "
-                "Calcul de délai impossible. Correction requise."
-            ),
-            field="invoice.issue_date"
-        ))
+        alerts.append(ALERT_TEMPLATES[AlertCode.MISSING_ISSUE_DATE])
         
         logger.error(
-            f"Invoice {invoice.invoice_id}: No date available for delay calculation"
+            "Invoice %s: No date available for delay calculation", invoice.invoice_id
         )
         
         return None, alerts
@@ -113,48 +167,21 @@ class PaymentTermsEngine:
         Returns:
             (applied_delay_days, alerts, computation_notes)
         """
-        alerts = []
-        notes = []
-        
-        # No contractual agreement (None or 0 means use default legal delay)
-        if contractual_delay_days is None or contractual_delay_days == 0:
-            notes.append(
-                f"Aucun délai contractuel stipulé. "
-                f"Application du délai légal par défaut: {self.DEFAULT_LEGAL_DELAY_DAYS} jours."
-            )
-            return self.DEFAULT_LEGAL_DELAY_DAYS, alerts, notes
-        
-        # Contractual delay within legal limit
-        if contractual_delay_days <= self.MAX_CONTRACTUAL_DELAY_DAYS:
-            notes.append(
-                f"Délai contractuel appliqué: {contractual_delay_days} jours "
-                f"(≤ maximum légal de {self.MAX_CONTRACTUAL_DELAY_DAYS} jours)."
-            )
-            return contractual_delay_days, alerts, notes
-        
-        # Contractual delay exceeds maximum - cap it
-        alerts.append(Alert(
-            code=AlertCode.CONTRACTUAL_DELAY_EXCEEDS_MAX,
-            severity=AlertSeverity.WARNING,
-            message=(
-                f"Délai contractuel ({contractual_delay_days} jours) "
-                f"dépasse le maximum légal ({self.MAX_CONTRACTUAL_DELAY_DAYS} jours). "
-                f"Application du plafond légal."
-            ),
-            field="contractual_delay_days"
-        ))
-        
-        notes.append(
-            f"Délai contractuel demandé: {contractual_delay_days} jours. "
-            f"Plafonné au maximum légal: {self.MAX_CONTRACTUAL_DELAY_DAYS} jours."
+        applied_delay, alerts, notes = _applied_delay(
+            contractual_delay_days,
+            self.DEFAULT_LEGAL_DELAY_DAYS,
+            self.MAX_CONTRACTUAL_DELAY_DAYS,
+            self.collect_notes
         )
         
-        logger.warning(
-            f"Contractual delay {contractual_delay_days} exceeds max, "
-            f"capped to {self.MAX_CONTRACTUAL_DELAY_DAYS}"
-        )
+        if alerts:
+            logger.warning(
+                "Contractual delay %s exceeds max, capped to %s",
+                contractual_delay_days, self.MAX_CONTRACTUAL_DELAY_DAYS
+            )
         
-        return self.MAX_CONTRACTUAL_DELAY_DAYS, alerts, notes
+        # Fresh lists at the boundary: callers extend/append to them
+        return applied_delay, list(alerts), list(notes)
     
     def compute_due_date(
         self,
@@ -181,29 +208,34 @@ class PaymentTermsEngine:
         raw_due_date = legal_start_date + timedelta(days=delay_days)
         
         # Adjust for business days
-        adjusted_due_date = self.calendar.next_business_day(raw_due_date)
+        adjusted_due_date = self._due_date_table.get(raw_due_date)
+        if adjusted_due_date is None:
+            adjusted_due_date = self.calendar.next_business_day(raw_due_date)
         
         if adjusted_due_date != raw_due_date:
-            notes.append(
-                f"Date d'échéance ajustée: {raw_due_date} (weekend/férié) "
-                f"→ {adjusted_due_date} (jour ouvrable suivant)."
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"Date d'échéance ajustée: {raw_due_date} (weekend/férié) "
+                    f"→ {adjusted_due_date} (jour ouvrable suivant)."
+                )
             logger.info(
-                f"Due date adjusted from {raw_due_date} to {adjusted_due_date} "
-                "(weekend/holiday)"
+                "Due date adjusted from %s to %s (weekend/holiday)",
+                raw_due_date, adjusted_due_date
             )
         else:
-            notes.append(
-                f"Date d'échéance calculée: {adjusted_due_date} "
-                f"({legal_start_date} + {delay_days} jours)."
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"Date d'échéance calculée: {adjusted_due_date} "
+                    f"({legal_start_date} + {delay_days} jours)."
+                )
         
         return adjusted_due_date, notes
     
     def compute_days_overdue(
         self,
         due_date: date,
-        payment_date: Optional[date]
+        payment_date: Optional[date],
+        as_of_date: Optional[date] = None
     ) -> Tuple[int, List[Alert]]:
         """
         Compute number of days overdue.
@@ -211,6 +243,8 @@ class PaymentTermsEngine:
         Args:
             due_date: Legal due date
             payment_date: Actual payment date (None if unpaid)
+            as_of_date: Reference date for unpaid invoices (default: today);
+                        batch runs pass one date for every invoice
         
         Returns:
             (days_overdue, alerts)
@@ -219,8 +253,8 @@ class PaymentTermsEngine:
         
         # Not yet paid
         if payment_date is None:
-            # Calculate delay from today
-            today = date.today()
+            # Calculate delay from today (or the batch reference date)
+            today = as_of_date or date.today()
             if today > due_date:
                 days_overdue = (today - due_date).days
                 
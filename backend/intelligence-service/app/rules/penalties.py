@@ -4,6 +4,23 @@ from datetime import date
 
 logger = logging.getLogger(__name__)
 
+# Constant computation notes (module-level, shared across invoices)
+_NOTE_NO_DELAY = "No delay - paid on time or before due date"
+_NOTE_NO_RATE = "Aucun retard. Taux de pénalité = 0%."
+_NOTE_ZERO_RATE = "Taux de pénalité = 0%. Pas de pénalité."
+_NOTE_ZERO_BASE = "Montant de base = 0. Pas de pénalité."
+
+
+def _months_of_delay_kernel(due_y: int, due_m: int, due_d: int, pay_y: int, pay_m: int, pay_d: int) -> int:
+    """
+    DGI month count on plain integers: calendar month transitions, +1 if the
+    payment day is past the due day, minimum 1 month.
+
+    Only called for payment dates after the due date, so the total is never
+    negative; `or 1` covers the minimum without a max() call.
+    """
+    return (pay_y - due_y) * 12 + (pay_m - due_m) + (pay_d > due_d) or 1
+
 
 class PenaltyEngine:
     """
@@ -21,20 +38,30 @@ class PenaltyEngine:
     - Uses calendar month boundaries, NOT 30-day periods
     """
 
+    __slots__ = ("base_rate", "monthly_increment", "collect_notes", "_rate_note_prefix")
+
     def __init__(
-        self, base_rate_percent: float = 2.25, monthly_increment_percent: float = 0.85
+        self,
+        base_rate_percent: float = 2.25,
+        monthly_increment_percent: float = 0.85,
+        collect_notes: bool = True
     ):
         """
         Args:
             base_rate_percent: Base penalty rate for 1st month (default 2.25%)
             monthly_increment_percent: Additional rate per month (default 0.85%)
+            collect_notes: Build the computation notes (skip for bulk runs)
         """
         self.base_rate = base_rate_percent
         self.monthly_increment = monthly_increment_percent
+        self.collect_notes = collect_notes
+        
+        # Rate-note prefix only depends on the engine's constants
+        self._rate_note_prefix = f"Taux de pénalité: {base_rate_percent}% (1er mois) + "
 
         logger.info(
-            f"PenaltyEngine initialized: base={base_rate_percent}%, "
-            f"increment={monthly_increment_percent}%"
+            "PenaltyEngine initialized: base=%s%%, increment=%s%%",
+            base_rate_percent, monthly_increment_percent
         )
 
     def compute_months_of_delay(self, due_date: date, payment_date: Optional[date]) -> Tuple[int, List[str]]:
@@ -65,13 +92,19 @@ class PenaltyEngine:
             (months_of_delay, computation_notes)
         """
         if not payment_date or payment_date <= due_date:
-            return 0, ["No delay - paid on time or before due date"]
+            return 0, [_NOTE_NO_DELAY] if self.collect_notes else []
+        
+        months = _months_of_delay_kernel(
+            due_date.year, due_date.month, due_date.day,
+            payment_date.year, payment_date.month, payment_date.day
+        )
+        
+        if not self.collect_notes:
+            return months, []
         
         # Step 1: Calculate calendar month transitions
         # How many full month boundaries did we cross?
-        year_diff = payment_date.year - due_date.year
-        month_diff = payment_date.month - due_date.month
-        month_transitions = year_diff * 12 + month_diff
+        month_transitions = (payment_date.year - due_date.year) * 12 + (payment_date.month - due_date.month)
         
         # Step 2: Day comparison - have we "started" that month's delay period?
         # If payment_day > due_day, we've entered the additional month period
@@ -79,30 +112,30 @@ class PenaltyEngine:
         day_penalty = 1 if payment_date.day > due_date.day else 0
         
         # Step 3: Total months = transitions + day penalty
+        # Step 4: CRITICAL - Any delay at all is at least 1 month (kernel applies the minimum)
         total_months = month_transitions + day_penalty
         
-        # Step 4: CRITICAL - Any delay at all is at least 1 month
-        # Even 1 day late in same month = 1 full month penalty
-        months = max(1, total_months)
-        
         # Calculate calendar days for audit trail
         calendar_days = (payment_date - due_date).days
         
         # Detailed computation notes for transparency
         notes = [
             f"DGI calendar calculation: {calendar_days} calendar days late",
-            f"Month transitions: {month_transitions} (from {due_date.strftime('%Y-%m')} to {payment_date.strftime('%Y-%m')})",
+            f"Month transitions: {month_transitions} (from {due_date.year:04d}-{due_date.month:02d} "
+            f"to {payment_date.year:04d}-{payment_date.month:02d})",
             f"Day comparison: payment day {payment_date.day} {'>' if day_penalty else '<='} due day {due_date.day}",
             f"Day penalty: {'+1 month' if day_penalty else 'no additional month'}",
             f"Calculation: {month_transitions} transitions + {day_penalty} day penalty = {total_months}",
             f"Final (min 1): {months} month(s) of delay"
         ]
         
-        logger.info(
-            f"DGI month calculation: {due_date} → {payment_date} = "
-            f"{calendar_days} days → {months} months "
-            f"(transitions: {month_transitions}, day_penalty: {day_penalty})"
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "DGI month calculation: %s → %s = %s days → %s months "
+                "(transitions: %s, day_penalty: %s)",
+                due_date, payment_date, calendar_days, months,
+                month_transitions, day_penalty
+            )
         
         return months, notes
 
@@ -125,19 +158,22 @@ class PenaltyEngine:
         notes = []
 
         if months_of_delay <= 0:
-            notes.append("Aucun retard. Taux de pénalité = 0%.")
+            if self.collect_notes:
+                notes.append(_NOTE_NO_RATE)
             return 0.0, notes
 
         # Calculate rate: base + (months - 1) × increment
-        rate = self.base_rate + (months_of_delay - 1) * self.monthly_increment
+        increment = self.monthly_increment
+        rate = self.base_rate + (months_of_delay - 1) * increment
 
-        notes.append(
-            f"Taux de pénalité: {self.base_rate}% (1er mois) "
-            f"+ {months_of_delay - 1} × {self.monthly_increment}% "
-            f"= {rate}%"
-        )
+        if self.collect_notes:
+            notes.append(
+                f"{self._rate_note_prefix}"
+                f"{months_of_delay - 1} × {increment}% "
+                f"= {rate}%"
+            )
 
-        logger.info(f"Penalty rate for {months_of_delay} months: {rate}%")
+        logger.info("Penalty rate for %s months: %s%%", months_of_delay, rate)
 
         return rate, notes
 
@@ -169,7 +205,8 @@ class PenaltyEngine:
         notes = []
 
         if penalty_rate <= 0:
-            notes.append("Taux de pénalité = 0%. Pas de pénalité.")
+            if self.collect_notes:
+                notes.append(_NOTE_ZERO_RATE)
             return 0.0, notes
 
         # DGI Rule: Penalties apply to the amount that WAS unpaid during the delay period
@@ -183,50 +220,56 @@ class PenaltyEngine:
         if is_late_full_payment:
             # Late but paid in full: penalties on full invoice amount
             penalty_base_amount = invoice_amount
-            notes.append(
-                f"⚠️ Paiement tardif mais complet: pénalités calculées sur montant facture "
-                f"({invoice_amount:.2f} MAD) pour {months_of_delay} mois de retard"
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"⚠️ Paiement tardif mais complet: pénalités calculées sur montant facture "
+                    f"({invoice_amount:.2f} MAD) pour {months_of_delay} mois de retard"
+                )
         elif is_late_partial_payment:
             # Late and partially paid: penalties on unpaid portion
             penalty_base_amount = unpaid_amount
             paid_amount = invoice_amount - unpaid_amount
-            notes.append(
-                f"⚠️ Paiement partiel tardif: pénalités calculées sur montant impayé "
-                f"({unpaid_amount:.2f} MAD) pour {months_of_delay} mois de retard. "
-                f"Montant payé: {paid_amount:.2f} MAD"
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"⚠️ Paiement partiel tardif: pénalités calculées sur montant impayé "
+                    f"({unpaid_amount:.2f} MAD) pour {months_of_delay} mois de retard. "
+                    f"Montant payé: {paid_amount:.2f} MAD"
+                )
         else:
             # Not paid or no delay: penalties on unpaid amount
             penalty_base_amount = unpaid_amount
 
         if penalty_base_amount <= 0:
-            notes.append("Montant de base = 0. Pas de pénalité.")
+            if self.collect_notes:
+                notes.append(_NOTE_ZERO_BASE)
             return 0.0, notes
 
         # Calculate penalty
-        penalty = penalty_base_amount * (penalty_rate / 100.0)
-        penalty = round(penalty, 2)
+        penalty = round(penalty_base_amount * (penalty_rate / 100.0), 2)
 
         if is_late_full_payment:
-            notes.append(
-                f"Montant de la pénalité: {penalty_base_amount:.2f} MAD (facture) "
-                f"× {penalty_rate}% = {penalty:.2f} MAD (paiement tardif complet)"
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"Montant de la pénalité: {penalty_base_amount:.2f} MAD (facture) "
+                    f"× {penalty_rate}% = {penalty:.2f} MAD (paiement tardif complet)"
+                )
         elif is_late_partial_payment:
-            notes.append(
-                f"Montant de la pénalité: {penalty_base_amount:.2f} MAD (impayé) "
-                f"× {penalty_rate}% = {penalty:.2f} MAD (paiement partiel tardif)"
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"Montant de la pénalité: {penalty_base_amount:.2f} MAD (impayé) "
+                    f"× {penalty_rate}% = {penalty:.2f} MAD (paiement partiel tardif)"
+                )
         else:
-            notes.append(
-                f"Montant de la pénalité: {penalty_base_amount:.2f} MAD "
-                f"× {penalty_rate}% = {penalty:.2f} MAD"
-            )
+            if self.collect_notes:
+                notes.append(
+                    f"Montant de la pénalité: {penalty_base_amount:.2f} MAD "
+                    f"× {penalty_rate}% = {penalty:.2f} MAD"
+                )
 
         logger.info(
-            f"Penalty calculated: {penalty_base_amount} × {penalty_rate}% = {penalty} MAD "
-            f"{'(late full payment)' if is_late_full_payment else ''}"
+            "Penalty calculated: %s × %s%% = %s MAD %s",
+            penalty_base_amount, penalty_rate, penalty,
+            "(late full payment)" if is_late_full_payment else ""
         )
 
         return penalty, notes
@@ -255,18 +298,90 @@ class PenaltyEngine:
         Returns:
             (months_of_delay, penalty_rate, penalty_amount, all_notes)
         """
+        months, rate, amount = self.compute_full_penalty_fast(
+            due_date, payment_date, unpaid_amount, invoice_amount
+        )
+        if not self.collect_notes:
+            return months, rate, amount, []
+
+        # Audit trail: replay the step-by-step helpers for their notes
         all_notes = []
+        all_notes.extend(self.compute_months_of_delay(due_date, payment_date)[1])
+        all_notes.extend(self.compute_penalty_rate(months)[1])
+        all_notes.extend(self.compute_penalty_amount(unpaid_amount, rate, invoice_amount, months)[1])
+
+        return months, rate, amount, all_notes
+
+    def compute_full_penalty_fast(
+        self,
+        due_date: date,
+        payment_date: Optional[date],
+        unpaid_amount: float,
+        invoice_amount: float
+    ) -> Tuple[int, float, float]:
+        """
+        Numbers-only penalty pipeline: no notes, no logging, no lists.
+
+        Args:
+            due_date: Legal due date
+            payment_date: Actual payment date (None if unpaid)
+            unpaid_amount: Current unpaid amount (TTC)
+            invoice_amount: Total invoice amount (for late full payments)
 
-        # Step 1: Months of delay
-        months, notes1 = self.compute_months_of_delay(due_date, payment_date)
-        all_notes.extend(notes1)
+        Returns:
+            (months_of_delay, penalty_rate, penalty_amount)
+        """
+        if not payment_date or payment_date <= due_date:
+            return 0, 0.0, 0.0
+        months = _months_of_delay_kernel(
+            due_date.year, due_date.month, due_date.day,
+            payment_date.year, payment_date.month, payment_date.day
+        )
+
+        rate = self.base_rate + (months - 1) * self.monthly_increment
+        if rate <= 0:
+            return months, rate, 0.0
+
+        # Late full payment: penalty on the invoice amount, otherwise on the unpaid amount
+        base_amount = invoice_amount if unpaid_amount == 0 and invoice_amount > 0 else unpaid_amount
+        if base_amount <= 0:
+            return months, rate, 0.0
+        return months, rate, round(base_amount * (rate / 100.0), 2)
+
+    def compute_full_penalty_batch(
+        self,
+        due_dates: List[date],
+        payment_dates: List[Optional[date]],
+        unpaid_amounts: List[float],
+        invoice_amounts: List[float]
+    ) -> Tuple[List[int], List[float], List[float]]:
+        """
+        Penalty pipeline over aligned columns (e.g. a whole DGI declaration).
+
+        Same rules as compute_full_penalty, but without computation notes or
+        per-row logging: each row goes through compute_full_penalty_fast.
+
+        Args:
+            due_dates: Legal due dates
+            payment_dates: Actual payment dates (None if unpaid)
+            unpaid_amounts: Current unpaid amounts (TTC)
+            invoice_amounts: Total invoice amounts
+
+        Returns:
+            (months_of_delay, penalty_rates, penalty_amounts), one entry per row
+        """
+        compute = self.compute_full_penalty_fast
 
-        # Step 2: Penalty rate
-        rate, notes2 = self.compute_penalty_rate(months)
-        all_notes.extend(notes2)
+        months_column = []
+        rates_column = []
+        amounts_column = []
 
-        # Step 3: Penalty amount (with invoice amount for late full payments)
-        amount, notes3 = self.compute_penalty_amount(unpaid_amount, rate, invoice_amount, months)
-        all_notes.extend(notes3)
+        for due_date, payment_date, unpaid_amount, invoice_amount in zip(
+            due_dates, payment_dates, unpaid_amounts, invoice_amounts
+        ):
+            months, rate, amount = compute(due_date, payment_date, unpaid_amount, invoice_amount)
+            months_column.append(months)
+            rates_column.append(rate)
+            amounts_column.append(amount)
 
-        return months, rate, amount, all_notes
\ No newline at end of file
+        return months_column, rates_column, amounts_column
\ No newline at end of file
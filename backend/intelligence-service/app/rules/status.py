@@ -1,12 +1,48 @@
-from typing import Tuple, List, Optional
+from typing import Dict, Tuple, List, Optional, Sequence
 import logging
 
 from ..schemas.invoice import InvoiceStruct
 from ..schemas.legal_result import LegalStatus
-from ..schemas.alerts import Alert, AlertCode, AlertSeverity
+from ..schemas.alerts import Alert, AlertCode, ALERT_TEMPLATES, alert_with_message
 
 logger = logging.getLogger(__name__)
 
+# Constant computation notes (module-level, shared across invoices)
+_NOTE_STATUS_CREDIT_NOTE = (
+    "Statut: AVOIR - Montant négatif. "
+    "Aucune pénalité de retard applicable."
+)
+_NOTE_STATUS_PROCEDURE_690 = (
+    "Statut: PROCÉDURE 690 - "
+    "Paiement interdit selon procédure collective. "
+    "Calcul de pénalité suspendu."
+)
+_NOTE_STATUS_DISPUTED = (
+    "Statut: LITIGE - "
+    "Facture sous contentieux juridique. "
+    "Pénalité suspendue jusqu'à jugement définitif."
+)
+_NOTE_STATUS_NORMAL = "Statut: NORMAL - Facture standard sans statut juridique particulier."
+_NOTE_APPLY_CREDIT_NOTE = (
+    "Application statut AVOIR: "
+    "Pénalité annulée (0.00 MAD). "
+    "Les avoirs ne sont pas soumis aux pénalités de retard."
+)
+
+# determine_legal_status outcomes, indexed by status then collect_notes
+_STATUS_RESULTS: Dict[LegalStatus, Dict[bool, Tuple[LegalStatus, Tuple[Alert, ...], Tuple[str, ...]]]] = {
+    status: {
+        True: (status, alerts, (note,)),
+        False: (status, alerts, ()),
+    }
+    for status, alerts, note in (
+        (LegalStatus.NORMAL, (), _NOTE_STATUS_NORMAL),
+        (LegalStatus.CREDIT_NOTE, (ALERT_TEMPLATES[AlertCode.CREDIT_NOTE],), _NOTE_STATUS_CREDIT_NOTE),
+        (LegalStatus.PROCEDURE_690, (ALERT_TEMPLATES[AlertCode.PROCEDURE_690],), _NOTE_STATUS_PROCEDURE_690),
+        (LegalStatus.DISPUTED, (ALERT_TEMPLATES[AlertCode.DISPUTED_INVOICE],), _NOTE_STATUS_DISPUTED),
+    )
+}
+
 
 class StatusEngine:
     """
@@ -21,9 +57,14 @@ class StatusEngine:
        → Payment forbidden, penalty blocked
     """
     
-    def __init__(self):
-        """Initialize status engine"""
-        pass
+    __slots__ = ("collect_notes",)
+    
+    def __init__(self, collect_notes: bool = True):
+        """
+        Args:
+            collect_notes: Build the French computation notes (skip for bulk runs)
+        """
+        self.collect_notes = collect_notes
     
     def determine_legal_status(
         self,
@@ -31,10 +72,13 @@ class StatusEngine:
         is_disputed: bool = False,
         is_credit_note: bool = False,
         is_procedure_690: bool = False
-    ) -> Tuple[LegalStatus, List[Alert], List[str]]:
+    ) -> Tuple[LegalStatus, Sequence[Alert], Sequence[str]]:
         """
         Determine the legal status of an invoice.
         
+        Every outcome is a prebuilt immutable tuple (shared alert templates
+        and constant notes); callers copy them with extend()/list().
+        
         Args:
             invoice: Invoice structure
             is_disputed: Invoice is under legal dispute
@@ -42,73 +86,27 @@ class StatusEngine:
             is_procedure_690: Supplier is under Article 690 procedure
         
         Returns:
-            (legal_status, alerts, computation_notes)
+            (legal_status, alerts, computation_notes) as tuples
         """
-        alerts = []
-        notes = []
+        invoice_amount = invoice.amounts.total_ttc or 0
+        
+        # Fast path: standard invoice (the vast majority)
+        if not (is_disputed or is_credit_note or is_procedure_690) and invoice_amount >= 0:
+            return _STATUS_RESULTS[LegalStatus.NORMAL][self.collect_notes]
         
         # Check for credit note (negative amount)
-        invoice_amount = invoice.amounts.total_ttc or 0
         if invoice_amount < 0 or is_credit_note:
-            alerts.append(Alert(
-                code=AlertCode.CREDIT_NOTE,
-                severity=AlertSeverity.INFO,
-                message="Avoir (credit note). Pas de pénalité applicable.",
-                field="amounts.total_ttc"
-            ))
-            notes.append(
-                "Statut: AVOIR - Montant négatif. "
-                "Aucune pénalité de retard applicable."
-            )
-            logger.info(f"Invoice {invoice.invoice_id}: CREDIT_NOTE detected")
-            return LegalStatus.CREDIT_NOTE, alerts, notes
+            logger.info("Invoice %s: CREDIT_NOTE detected", invoice.invoice_id)
+            return _STATUS_RESULTS[LegalStatus.CREDIT_NOTE][self.collect_notes]
         
         # Check for procedure 690
         if is_procedure_690:
-            alerts.append(Alert(
-                code=AlertCode.PROCEDURE_690,
-                severity=AlertSeverity.WARNING,
-                message=(
-                    "Fournisseur sous procédure Article 690 "
-                    "(sauvegarde/redressement/liquidation). "
-                    "Paiement interdit. Pénalité bloquée."
-                ),
-                field="legal_status"
-            ))
-            notes.append(
-                "Statut: PROCÉDURE 690 - "
-                "Paiement interdit selon procédure collective. "
-                "Calcul de pénalité suspendu."
-            )
-            logger.warning(
-                f"Invoice {invoice.invoice_id}: PROCEDURE_690 status applied"
-            )
-            return LegalStatus.PROCEDURE_690, alerts, notes
-        
-        # Check for disputed invoice
-        if is_disputed:
-            alerts.append(Alert(
-                code=AlertCode.DISPUTED_INVOICE,
-                severity=AlertSeverity.WARNING,
-                message=(
-                    "Facture contestée (litige judiciaire). "
-                    "Calcul de pénalité suspendu jusqu'à décision de justice."
-                ),
-                field="legal_status"
-            ))
-            notes.append(
-                "Statut: LITIGE - "
-                "Facture sous contentieux juridique. "
-                "Pénalité suspendue jusqu'à jugement définitif."
-            )
-            logger.warning(
-                f"Invoice {invoice.invoice_id}: DISPUTED status applied"
-            )
-            return LegalStatus.DISPUTED, alerts, notes
+            logger.warning("Invoice %s: PROCEDURE_690 status applied", invoice.invoice_id)
+            return _STATUS_RESULTS[LegalStatus.PROCEDURE_690][self.collect_notes]
         
-        # Normal status
-        notes.append("Statut: NORMAL - Facture standard sans statut juridique particulier.")
-        return LegalStatus.NORMAL, alerts, notes
+        # Remaining case: disputed invoice
+        logger.warning("Invoice %s: DISPUTED status applied", invoice.invoice_id)
+        return _STATUS_RESULTS[LegalStatus.DISPUTED][self.collect_notes]
     
     def apply_status_rules(
         self,
@@ -129,36 +127,36 @@ class StatusEngine:
         
         # Credit note: no penalty
         if legal_status == LegalStatus.CREDIT_NOTE:
-            notes.append(
-                "Application statut AVOIR: "
-                "Pénalité annulée (0.00 MAD). "
-                "Les avoirs ne sont pas soumis aux pénalités de retard."
-            )
+            if self.collect_notes:
+                notes.append(_NOTE_APPLY_CREDIT_NOTE)
             return 0.0, False, notes
         
         # Procedure 690: penalty blocked
         if legal_status == LegalStatus.PROCEDURE_690:
-            notes.append(
-                "Application statut PROCÉDURE 690: "
-                f"Pénalité suspendue ({base_penalty_amount:.2f} MAD calculée mais non appliquée). "
-                "Pénalité bloquée pendant toute la durée de la procédure collective."
-            )
+            if self.collect_notes:
+                notes.append(
+                    "Application statut PROCÉDURE 690: "
+                    f"Pénalité suspendue ({base_penalty_amount:.2f} MAD calculée mais non appliquée). "
+                    "Pénalité bloquée pendant toute la durée de la procédure collective."
+                )
             return 0.0, True, notes
         
         # Disputed: penalty suspended
         if legal_status == LegalStatus.DISPUTED:
-            notes.append(
-                "Application statut LITIGE: "
-                f"Pénalité suspendue ({base_penalty_amount:.2f} MAD calculée mais non appliquée). "
-                "Application rétroactive après décision de justice définitive."
-            )
+            if self.collect_notes:
+                notes.append(
+                    "Application statut LITIGE: "
+                    f"Pénalité suspendue ({base_penalty_amount:.2f} MAD calculée mais non appliquée). "
+                    "Application rétroactive après décision de justice définitive."
+                )
             return 0.0, True, notes
         
         # Normal: apply penalty as calculated
-        notes.append(
-            f"Application statut NORMAL: "
-            f"Pénalité applicable = {base_penalty_amount:.2f} MAD."
-        )
+        if self.collect_notes:
+            notes.append(
+                f"Application statut NORMAL: "
+                f"Pénalité applicable = {base_penalty_amount:.2f} MAD."
+            )
         return base_penalty_amount, False, notes
     
     def check_payment_validity(
@@ -197,19 +195,15 @@ class StatusEngine:
         
         # Check if payment is before invoice
         if invoice_date and payment_date < invoice_date:
-            alerts.append(Alert(
-                code=AlertCode.PAYMENT_BEFORE_INVOICE,
-                severity=AlertSeverity.ERROR,
-                message=(
-                    f"Incohérence temporelle: "
-                    f"Paiement ({payment_date}) avant émission de facture ({invoice_date}). "
-                    "Vérification manuelle requise."
-                ),
-                field="payment_date"
+            alerts.append(alert_with_message(
+                AlertCode.PAYMENT_BEFORE_INVOICE,
+                f"Incohérence temporelle: "
+                f"Paiement ({payment_date}) avant émission de facture ({invoice_date}). "
+                "Vérification manuelle requise."
             ))
             logger.error(
-                f"Invoice {invoice.invoice_id}: "
-                f"Payment date {payment_date} before invoice date {invoice_date}"
+                "Invoice %s: Payment date %s before invoice date %s",
+                invoice.invoice_id, payment_date, invoice_date
             )
         
         return alerts
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
 from enum import Enum
 
 
@@ -11,6 +11,12 @@ class AlertSeverity(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+# Severity groups as frozensets: membership is one hash lookup, and since
+# the enums are str-valued it also matches plain strings from JSON payloads
+REVIEW_SEVERITIES = frozenset({AlertSeverity.WARNING, AlertSeverity.ERROR, AlertSeverity.CRITICAL})
+CRITICAL_SEVERITIES = frozenset({AlertSeverity.ERROR, AlertSeverity.CRITICAL})
+
+
 class AlertCode(str, Enum):
     """Standardized alert codes for DGI compliance"""
     # Missing data alerts
@@ -36,15 +42,102 @@ class AlertCode(str, Enum):
     AMOUNT_MISMATCH = "AMOUNT_MISMATCH"
 
 
-class Alert(BaseModel):
+@dataclass(frozen=True, slots=True)
+class Alert:
     """
     Alert for DGI compliance issues and data quality.
     All alerts are logged for audit trail.
+    
+    Plain slotted dataclass (internal DTO): pydantic models embedding it
+    still validate and serialize it. Frozen: constant alerts are shared
+    instances (see ALERT_TEMPLATES).
     """
     code: AlertCode
     severity: AlertSeverity
     message: str
     field: Optional[str] = None
-    
-    class Config:
-        use_enum_values = True
\ No newline at end of file
+
+
+# Prebuilt alerts, shared by reference across invoices. Codes whose message
+# depends on the invoice go through alert_with_message().
+ALERT_TEMPLATES: Dict[AlertCode, Alert] = {
+    alert.code: alert
+    for alert in (
+        Alert(
+            code=AlertCode.MISSING_DELIVERY_DATE,
+            severity=AlertSeverity.WARNING,
+            message=(
+                "Date de livraison manquante. "
+                "Utilisation de la date de facture par défaut. "
+                "Vérification manuelle recommandée."
+            ),
+            field="invoice.delivery_date"
+        ),
+        Alert(
+            code=AlertCode.MISSING_ISSUE_DATE,
+            severity=AlertSeverity.CRITICAL,
+            message=(
+                "Aucune date disponible (livraison ni facture). "
+                "Calcul de délai impossible. Correction requise."
+            ),
+            field="invoice.issue_date"
+        ),
+        Alert(
+            code=AlertCode.CONTRACTUAL_DELAY_EXCEEDS_MAX,
+            severity=AlertSeverity.WARNING,
+            message="",
+            field="contractual_delay_days"
+        ),
+        Alert(
+            code=AlertCode.PAYMENT_BEFORE_INVOICE,
+            severity=AlertSeverity.ERROR,
+            message="",
+            field="payment_date"
+        ),
+        Alert(
+            code=AlertCode.CREDIT_NOTE,
+            severity=AlertSeverity.INFO,
+            message="Avoir (credit note). Pas de pénalité applicable.",
+            field="amounts.total_ttc"
+        ),
+        Alert(
+            code=AlertCode.PROCEDURE_690,
+            severity=AlertSeverity.WARNING,
+            message=(
+                "Fournisseur sous procédure Article 690 "
+                "(sauvegarde/redressement/liquidation). "
+                "Paiement interdit. Pénalité bloquée."
+            ),
+            field="legal_status"
+        ),
+        Alert(
+            code=AlertCode.DISPUTED_INVOICE,
+            severity=AlertSeverity.WARNING,
+            message=(
+                "Facture contestée (litige judiciaire). "
+                "Calcul de pénalité suspendu jusqu'à décision de justice."
+            ),
+            field="legal_status"
+        ),
+        Alert(
+            code=AlertCode.LOW_CONFIDENCE_MATCH,
+            severity=AlertSeverity.WARNING,
+            message="",
+            field="matching"
+        ),
+        Alert(
+            code=AlertCode.PARTIAL_PAYMENT_DETECTED,
+            severity=AlertSeverity.INFO,
+            message="Paiement partiel détecté: ",
+            field="matching"
+        ),
+    )
+}
+
+
+def alert_with_message(code: AlertCode, message: str) -> Alert:
+    """
+    Copy of a template alert with an invoice-specific message
+    (no re-validation of code/severity/field).
+    """
+    return replace(ALERT_TEMPLATES[code], message=message)
\ No newline at end of file
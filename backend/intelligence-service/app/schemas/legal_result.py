@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import date
 from enum import Enum
@@ -115,5 +115,4 @@ class LegalResult(BaseModel):
         description="Nécessite une validation manuelle"
     )
     
-    class Config:
-        use_enum_values = True
\ No newline at end of file
+    model_config = ConfigDict(use_enum_values=True)
\ No newline at end of file
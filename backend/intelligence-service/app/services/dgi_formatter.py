@@ -1,14 +1,27 @@
 from typing import List
+from enum import Enum
+from itertools import compress
+from operator import attrgetter, not_, sub
 import logging
 
 from ..schemas.invoice import InvoiceStruct
 from ..schemas.matching import MatchingResult
 from ..schemas.legal_result import LegalResult
 from ..schemas.dgi_output import DGIDeclaration, DGIInvoiceLine
+from ..schemas.alerts import CRITICAL_SEVERITIES
 
 logger = logging.getLogger(__name__)
 
 
+def _status_str(status) -> str:
+    """
+    Enum value as a plain string (statuses arrive as members or, with
+    use_enum_values, already as strings). Note: str() of a str-mixin enum
+    member gives 'PaymentStatus.PAID', not the value.
+    """
+    return status.value if isinstance(status, Enum) else status
+
+
 class DGIFormatter:
     """
     Format extracted, matched, and legally computed data into DGI declaration structure.
@@ -51,55 +64,51 @@ class DGIFormatter:
             raise ValueError("Invoices, matching_results, and legal_results must have same length")
 
         
-        invoice_lines = []
+        # Status strings resolved once per invoice
+        payment_statuses = [_status_str(matching.payment_status) for matching in matching_results]
+        
+        # Line construction is self-free (staticmethod), so it runs as one
+        # C-level map over the aligned columns
+        invoice_lines = list(map(
+            self._create_invoice_line,
+            invoices,
+            matching_results,
+            legal_results,
+            payment_statuses,
+            map(_status_str, map(attrgetter("legal_status"), legal_results))
+        ))
+        
+        # Numeric columns pulled once with C-level map/attrgetter; each total
+        # is then a single sum() over a list (no per-invoice bytecode)
+        amounts_ttc = list(map(attrgetter("invoice_amount_ttc"), legal_results))
+        amounts_paid = list(map(attrgetter("paid_amount"), legal_results))
+        penalties = list(map(attrgetter("penalty_amount"), legal_results))
+        suspended_mask = list(map(attrgetter("penalty_suspended"), legal_results))
         
         # Financial totals
-        total_invoiced = 0.0
-        total_paid = 0.0
-        total_unpaid = 0.0
+        total_invoiced = sum(amounts_ttc, 0.0)
+        total_paid = sum(amounts_paid, 0.0)
+        total_unpaid = sum(map(sub, amounts_ttc, amounts_paid), 0.0)
         
         # Penalty totals
-        total_penalty = 0.0
-        total_penalty_suspended = 0.0
-        
-        # Quality metrics
-        total_alerts = 0
-        invoices_requiring_review = 0
-        
-        # Compliance counts
-        invoices_on_time = 0
-        invoices_delayed = 0
-        invoices_unpaid = 0
-        
-        for invoice, matching, legal in zip(invoices, matching_results, legal_results):
-            line = self._create_invoice_line(invoice, matching, legal)
-            invoice_lines.append(line)
-            
-            # Update totals
-            total_invoiced += line.invoice_amount_ttc or 0
-            total_paid += line.payment_amount or 0
-            total_unpaid += (line.invoice_amount_ttc or 0) - (line.payment_amount or 0)
-            
-            if legal.penalty_suspended:
-                total_penalty_suspended += legal.penalty_amount
-            else:
-                total_penalty += legal.penalty_amount
-            
-            total_alerts += len(legal.alerts)
-            if legal.requires_manual_review:
-                invoices_requiring_review += 1
-            
-            # Compliance status - FIXED: Safe enum/string handling
-            payment_status = matching.payment_status.value if hasattr(matching.payment_status, 'value') else str(matching.payment_status)
-            if payment_status == "PAID":
-                if legal.days_overdue == 0:
-                    invoices_on_time += 1
-                else:
-                    invoices_delayed += 1
-            else:
-                invoices_unpaid += 1
-        
-        declaration = DGIDeclaration(
+        total_penalty = sum(compress(penalties, map(not_, suspended_mask)), 0.0)
+        total_penalty_suspended = sum(compress(penalties, suspended_mask), 0.0)
+        
+        # Quality metrics (alert counts already taken once per line)
+        total_alerts = sum(map(attrgetter("alert_count"), invoice_lines))
+        invoices_requiring_review = sum(map(attrgetter("requires_manual_review"), legal_results))
+        
+        # Compliance counts from two boolean columns (paid, zero overdue),
+        # reduced with compress/sum instead of per-invoice branches
+        paid_mask = list(map("PAID".__eq__, payment_statuses))
+        no_overdue_mask = map(not_, map(attrgetter("days_overdue"), legal_results))
+        invoices_unpaid = len(paid_mask) - sum(paid_mask)
+        invoices_on_time = sum(compress(no_overdue_mask, paid_mask))
+        invoices_delayed = len(invoice_lines) - invoices_unpaid - invoices_on_time
+        
+        # Trusted internal data (our own extraction/matching/legal pipeline):
+        # build without re-running pydantic validation
+        declaration = DGIDeclaration.model_construct(
             company_ice=company_ice,
             company_name=company_name,
             company_rc=company_rc,
@@ -129,113 +138,98 @@ class DGIFormatter:
         
         return declaration
     
+    @staticmethod
     def _create_invoice_line(
-        self,
         invoice: InvoiceStruct,
         matching: MatchingResult,
-        legal: LegalResult
+        legal: LegalResult,
+        payment_status: str,
+        legal_status: str
     ) -> DGIInvoiceLine:
         """
         Create a single DGI invoice line with all legal computations.
+        Status strings are resolved by the caller (see _status_str).
         """
-        # Get first (best) payment if exists
-        payment_date = legal.actual_payment_date
-        payment_amount = legal.paid_amount
+        # Fields shared with the remarks, read once
+        supplier = invoice.supplier
+        header = invoice.invoice
+        alerts = legal.alerts
+        penalty_amount = legal.penalty_amount
+        penalty_rate = legal.penalty_rate
+        penalty_suspended = legal.penalty_suspended
         
         # Build remarks
-        remarks = self._generate_remarks(invoice, matching, legal)
-        
-        # Safe string conversion for enums
-        payment_status_str = (
-            matching.payment_status.value 
-            if hasattr(matching.payment_status, 'value') 
-            else str(matching.payment_status)
+        remarks = DGIFormatter._generate_remarks(
+            invoice, matching, legal, payment_status, legal_status,
+            alerts, penalty_amount, penalty_rate, penalty_suspended
         )
         
-        legal_status_str = (
-            legal.legal_status.value 
-            if hasattr(legal.legal_status, 'value') 
-            else str(legal.legal_status)
-        )
-        
-        return DGIInvoiceLine(
-            supplier_name=invoice.supplier.name,
-            supplier_ice=invoice.supplier.ice,
-            invoice_number=invoice.invoice.number,
-            invoice_date=invoice.invoice.issue_date,
+        # Inputs are already-validated pipeline models: skip validation
+        return DGIInvoiceLine.model_construct(
+            supplier_name=supplier.name,
+            supplier_ice=supplier.ice,
+            invoice_number=header.number,
+            invoice_date=header.issue_date,
             invoice_amount_ttc=legal.invoice_amount_ttc,
             legal_start_date=legal.legal_start_date,
             legal_due_date=legal.legal_due_date,
-            payment_date=payment_date,
-            payment_amount=payment_amount,
+            payment_date=legal.actual_payment_date,
+            payment_amount=legal.paid_amount,
             contractual_payment_delay=legal.contractual_delay_days,
             applied_legal_delay=legal.applied_legal_delay_days,
             actual_payment_delay=legal.days_overdue,
             months_of_delay=legal.months_of_delay,
-            penalty_rate=legal.penalty_rate,
-            penalty_amount=legal.penalty_amount,
-            penalty_suspended=legal.penalty_suspended,
-            payment_status=payment_status_str,  # ← FIXED
-            legal_status=legal_status_str,       # ← FIXED
+            penalty_rate=penalty_rate,
+            penalty_amount=penalty_amount,
+            penalty_suspended=penalty_suspended,
+            payment_status=payment_status,
+            legal_status=legal_status,
             remarks=remarks,
             requires_manual_review=legal.requires_manual_review,
-            alert_count=len(legal.alerts)
+            alert_count=len(alerts)
         )
     
+    @staticmethod
     def _generate_remarks(
-        self,
         invoice: InvoiceStruct,
         matching: MatchingResult,
-        legal: LegalResult
+        legal: LegalResult,
+        payment_status: str,
+        legal_status: str,
+        alerts: List,
+        penalty_amount: float,
+        penalty_rate: float,
+        penalty_suspended: bool
     ) -> str:
         """
         Generate comprehensive remarks for audit trail.
+        Penalty fields and alerts come from _create_invoice_line, which has
+        already read them off legal.
         """
-        remarks = []
-        
-        # Matching confidence
-        if matching.matches:
-            best_match = matching.matches[0]
-            remarks.append(f"Confiance matching: {best_match.confidence_score:.0f}%")
-            
-            if best_match.confidence_score < 80:
-                remarks.append("⚠ Validation manuelle recommandée")
-        
-        # Payment status - FIXED: Safe enum/string handling
-        payment_status = matching.payment_status.value if hasattr(matching.payment_status, 'value') else str(matching.payment_status)
-        if payment_status == "PARTIALLY_PAID":
-            remarks.append(
+        best_score = matching.matches[0].confidence_score if matching.matches else None
+        critical_count = sum(1 for alert in alerts if alert.severity in CRITICAL_SEVERITIES)
+        missing_fields = invoice.missing_fields
+        
+        # One tuple, empty string where a remark does not apply
+        remarks = (
+            # Matching confidence
+            f"Confiance matching: {best_score:.0f}%" if best_score is not None else "",
+            "⚠ Validation manuelle recommandée" if best_score is not None and best_score < 80 else "",
+            # Payment status
+            (
                 f"Paiement partiel: {legal.paid_amount:.2f} / "
                 f"{legal.invoice_amount_ttc:.2f} MAD"
-            )
-        
-        # Legal status - FIXED: Safe enum/string handling
-        legal_status = legal.legal_status.value if hasattr(legal.legal_status, 'value') else str(legal.legal_status)
-        if legal_status != "NORMAL":
-            remarks.append(f"Statut: {legal_status}")
-        
-        # Penalty info
-        if legal.penalty_suspended:
-            remarks.append(
-                f"Pénalité suspendue: {legal.penalty_amount:.2f} MAD"
-            )
-        elif legal.penalty_amount > 0:
-            remarks.append(
-                f"Pénalité: {legal.penalty_amount:.2f} MAD ({legal.penalty_rate:.2f}%)"
-            )
-        
-        # Critical alerts
-        critical_alerts = [
-            alert for alert in legal.alerts 
-            if alert.severity in ("ERROR", "CRITICAL")
-        ]
-        if critical_alerts:
-            remarks.append(f"⚠ {len(critical_alerts)} alerte(s) critique(s)")
-        
-        # Missing fields
-        if invoice.missing_fields:
-            remarks.append(
-                f"Champs manquants: {len(invoice.missing_fields)}"
-            )
-        
-        return " | ".join(remarks) if remarks else None
\ No newline at end of file
+            ) if payment_status == "PARTIALLY_PAID" else "",
+            # Legal status
+            f"Statut: {legal_status}" if legal_status != "NORMAL" else "",
+            # Penalty info
+            f"Pénalité suspendue: {penalty_amount:.2f} MAD" if penalty_suspended
+            else f"Pénalité: {penalty_amount:.2f} MAD ({penalty_rate:.2f}%)" if penalty_amount > 0
+            else "",
+            # Critical alerts
+            f"⚠ {critical_count} alerte(s) critique(s)" if critical_count else "",
+            # Missing fields
+            f"Champs manquants: {len(missing_fields)}" if missing_fields else "",
+        )
+        
+        return " | ".join(filter(None, remarks)) or None
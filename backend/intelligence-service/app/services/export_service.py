@@ -4,16 +4,75 @@ import io
 import logging
 from datetime import datetime
 
+from pydantic import TypeAdapter
+
 from ..schemas.dgi_output import DGIDeclaration, DGIInvoiceLine
 
 logger = logging.getLogger(__name__)
 
 
+# Column headers of the invoice detail section
+CSV_HEADERS = (
+    "Fournisseur",
+    "ICE Fournisseur",
+    "N° Facture",
+    "Date Facture",
+    "Date Référence Légale",
+    "Date Échéance Légale",
+    "Montant TTC (MAD)",
+    "Date Paiement",
+    "Montant Payé (MAD)",
+    "Délai Contractuel (jours)",
+    "Délai Légal Appliqué (jours)",
+    "Retard Réel (jours)",
+    "Mois de Retard",
+    "Taux Pénalité (%)",
+    "Montant Pénalité (MAD)",
+    "Pénalité Suspendue",
+    "Statut Paiement",
+    "Statut Juridique",
+    "Validation Requise",
+    "Nombre Alertes",
+    "Remarques"
+)
+
+# Built once: JSON export reuses the same pydantic-core serializer
+_DECLARATION_ADAPTER = TypeAdapter(DGIDeclaration)
+
+# Per-invoice blocks of the alerts report (one format_map per invoice)
+_REVIEW_BLOCK = (
+    "Facture: {number}\n"
+    "  Fournisseur: {supplier}\n"
+    "  Montant: {amount:.2f} MAD\n"
+    "  Statut: {status}\n"
+    "  Alertes: {alerts}"
+)
+_HIGH_PENALTY_BLOCK = (
+    "Facture: {number}\n"
+    "  Fournisseur: {supplier}\n"
+    "  Montant facture: {amount:.2f} MAD\n"
+    "  Retard: {days} jours ({months} mois)\n"
+    "  Pénalité: {penalty:.2f} MAD ({rate:.2f}%)"
+)
+
+
 class ExportService:
     """
     Export DGI declarations to CSV/Excel formats.
     """
     
+    def export_to_json(self, declaration: DGIDeclaration) -> bytes:
+        """
+        Export DGI declaration to JSON.
+        
+        Args:
+            declaration: DGI declaration to export
+        
+        Returns:
+            UTF-8 JSON bytes (serialized in pydantic-core, no dict intermediate)
+        """
+        return _DECLARATION_ADAPTER.dump_json(declaration)
+    
     def export_to_csv(self, declaration: DGIDeclaration) -> bytes:
         """
         Export DGI declaration to CSV format.
@@ -24,96 +83,56 @@ class ExportService:
         Returns:
             CSV file content as bytes
         """
-        output = io.StringIO()
-        
-        # Write header information
-        output.write(f"DÉCLARATION DES DÉLAIS DE PAIEMENT\n")
-        output.write(f"Entreprise: {declaration.company_name}\n")
-        output.write(f"ICE: {declaration.company_ice}\n")
-        output.write(f"RC: {declaration.company_rc}\n")
-        output.write(f"Année: {declaration.declaration_year}\n")
+        # Encode as rows are written (BOM for Excel compatibility): no final
+        # str -> bytes copy of the whole document
+        buffer = io.BytesIO()
+        output = io.TextIOWrapper(buffer, encoding='utf-8-sig', newline='', write_through=True)
+        writer = csv.writer(output)
+        
+        # Header block, summary and detail rows all go through the csv writer
+        # (uniform quoting: company names may contain commas)
+        header_rows = [
+            ("DÉCLARATION DES DÉLAIS DE PAIEMENT",),
+            (f"Entreprise: {declaration.company_name}",),
+            (f"ICE: {declaration.company_ice}",),
+            (f"RC: {declaration.company_rc}",),
+            (f"Année: {declaration.declaration_year}",),
+        ]
         if declaration.declaration_month:
-            output.write(f"Mois: {declaration.declaration_month}\n")
+            header_rows.append((f"Mois: {declaration.declaration_month}",))
         if declaration.activity_sector:
-            output.write(f"Secteur: {declaration.activity_sector}\n")
-        output.write(f"Date d'export: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.write("\n")
+            header_rows.append((f"Secteur: {declaration.activity_sector}",))
+        header_rows.append((f"Date d'export: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",))
+        header_rows.append(())
+        writer.writerows(header_rows)
         
         # Write summary
-        output.write("RÉSUMÉ\n")
-        output.write(f"Nombre total de factures,{declaration.total_invoices}\n")
-        output.write(f"Montant total facturé (MAD),{declaration.total_amount_invoiced:.2f}\n")
-        output.write(f"Montant total payé (MAD),{declaration.total_amount_paid:.2f}\n")
-        output.write(f"Montant total impayé (MAD),{declaration.total_amount_unpaid:.2f}\n")
-        output.write(f"Total pénalités (MAD),{declaration.total_penalty_amount:.2f}\n")
-        output.write(f"Total pénalités suspendues (MAD),{declaration.total_penalty_suspended:.2f}\n")
-        output.write(f"Factures payées à temps,{declaration.invoices_on_time}\n")
-        output.write(f"Factures payées en retard,{declaration.invoices_delayed}\n")
-        output.write(f"Factures impayées,{declaration.invoices_unpaid}\n")
-        output.write(f"Factures nécessitant validation,{declaration.invoices_requiring_review}\n")
-        output.write(f"Nombre total d'alertes,{declaration.total_alerts}\n")
-        output.write("\n")
+        writer.writerows((
+            ("RÉSUMÉ",),
+            ("Nombre total de factures", declaration.total_invoices),
+            ("Montant total facturé (MAD)", format(declaration.total_amount_invoiced, ".2f")),
+            ("Montant total payé (MAD)", format(declaration.total_amount_paid, ".2f")),
+            ("Montant total impayé (MAD)", format(declaration.total_amount_unpaid, ".2f")),
+            ("Total pénalités (MAD)", format(declaration.total_penalty_amount, ".2f")),
+            ("Total pénalités suspendues (MAD)", format(declaration.total_penalty_suspended, ".2f")),
+            ("Factures payées à temps", declaration.invoices_on_time),
+            ("Factures payées en retard", declaration.invoices_delayed),
+            ("Factures impayées", declaration.invoices_unpaid),
+            ("Factures nécessitant validation", declaration.invoices_requiring_review),
+            ("Nombre total d'alertes", declaration.total_alerts),
+            (),
+        ))
         
         # Write invoice details
-        output.write("DÉTAIL DES FACTURES\n")
-        
-        writer = csv.writer(output)
+        writer.writerow(("DÉTAIL DES FACTURES",))
+        writer.writerow(CSV_HEADERS)
         
-        # Column headers
-        headers = [
-            "Fournisseur",
-            "ICE Fournisseur",
-            "N° Facture",
-            "Date Facture",
-            "Date Référence Légale",
-            "Date Échéance Légale",
-            "Montant TTC (MAD)",
-            "Date Paiement",
-            "Montant Payé (MAD)",
-            "Délai Contractuel (jours)",
-            "Délai Légal Appliqué (jours)",
-            "Retard Réel (jours)",
-            "Mois de Retard",
-            "Taux Pénalité (%)",
-            "Montant Pénalité (MAD)",
-            "Pénalité Suspendue",
-            "Statut Paiement",
-            "Statut Juridique",
-            "Validation Requise",
-            "Nombre Alertes",
-            "Remarques"
-        ]
-        writer.writerow(headers)
-        
-        # Data rows
-        for inv in declaration.invoices:
-            row = [
-                inv.supplier_name or "",
-                inv.supplier_ice or "",
-                inv.invoice_number or "",
-                inv.invoice_date.isoformat() if inv.invoice_date else "",
-                inv.legal_start_date.isoformat() if inv.legal_start_date else "",
-                inv.legal_due_date.isoformat() if inv.legal_due_date else "",
-                f"{inv.invoice_amount_ttc:.2f}" if inv.invoice_amount_ttc else "",
-                inv.payment_date.isoformat() if inv.payment_date else "",
-                f"{inv.payment_amount:.2f}" if inv.payment_amount else "",
-                str(inv.contractual_payment_delay) if inv.contractual_payment_delay else "",
-                str(inv.applied_legal_delay),
-                str(inv.actual_payment_delay),
-                str(inv.months_of_delay),
-                f"{inv.penalty_rate:.2f}",
-                f"{inv.penalty_amount:.2f}",
-                "OUI" if inv.penalty_suspended else "NON",
-                inv.payment_status,
-                inv.legal_status,
-                "OUI" if inv.requires_manual_review else "NON",
-                str(inv.alert_count),
-                inv.remarks or ""
-            ]
-            writer.writerow(row)
+        # Data rows: one C-level writerows call over a lazy row generator
+        writer.writerows(map(self._csv_row, declaration.invoices))
         
         # Get CSV content
-        csv_content = output.getvalue()
+        output.flush()
+        csv_content = buffer.getvalue()
         output.close()
         
         logger.info(
@@ -121,7 +140,34 @@ class ExportService:
             f"{declaration.total_invoices} invoices"
         )
         
-        return csv_content.encode('utf-8-sig')  # BOM for Excel compatibility
+        return csv_content
+    
+    @staticmethod
+    def _csv_row(inv: DGIInvoiceLine) -> tuple:
+        """Format one declaration line as a CSV row."""
+        return (
+            inv.supplier_name or "",
+            inv.supplier_ice or "",
+            inv.invoice_number or "",
+            inv.invoice_date.isoformat() if inv.invoice_date else "",
+            inv.legal_start_date.isoformat() if inv.legal_start_date else "",
+            inv.legal_due_date.isoformat() if inv.legal_due_date else "",
+            format(inv.invoice_amount_ttc, ".2f") if inv.invoice_amount_ttc else "",
+            inv.payment_date.isoformat() if inv.payment_date else "",
+            format(inv.payment_amount, ".2f") if inv.payment_amount else "",
+            str(inv.contractual_payment_delay) if inv.contractual_payment_delay else "",
+            str(inv.applied_legal_delay),
+            str(inv.actual_payment_delay),
+            str(inv.months_of_delay),
+            format(inv.penalty_rate, ".2f"),
+            format(inv.penalty_amount, ".2f"),
+            "OUI" if inv.penalty_suspended else "NON",
+            inv.payment_status,
+            inv.legal_status,
+            "OUI" if inv.requires_manual_review else "NON",
+            str(inv.alert_count),
+            inv.remarks or ""
+        )
     
     def export_alerts_summary(self, declaration: DGIDeclaration) -> str:
         """
@@ -156,11 +202,14 @@ class ExportService:
         lines.append(f"Total alertes: {declaration.total_alerts}")
         lines.append("")
         
-        # Invoices requiring review
-        review_invoices = [
-            inv for inv in declaration.invoices 
-            if inv.requires_manual_review
-        ]
+        # Single pass over the invoices, partitioned into both sections
+        review_invoices = []
+        high_penalty_invoices = []
+        for inv in declaration.invoices:
+            if inv.requires_manual_review:
+                review_invoices.append(inv)
+            if inv.penalty_amount > 1000:  # More than 1000 MAD
+                high_penalty_invoices.append(inv)
         
         if review_invoices:
             lines.append("-" * 80)
@@ -169,21 +218,18 @@ class ExportService:
             lines.append("")
             
             for inv in review_invoices:
-                lines.append(f"Facture: {inv.invoice_number or 'N/A'}")
-                lines.append(f"  Fournisseur: {inv.supplier_name or 'N/A'}")
-                lines.append(f"  Montant: {inv.invoice_amount_ttc:.2f} MAD")
-                lines.append(f"  Statut: {inv.payment_status}")
-                lines.append(f"  Alertes: {inv.alert_count}")
+                lines.append(_REVIEW_BLOCK.format_map({
+                    "number": inv.invoice_number or 'N/A',
+                    "supplier": inv.supplier_name or 'N/A',
+                    "amount": inv.invoice_amount_ttc,
+                    "status": inv.payment_status,
+                    "alerts": inv.alert_count
+                }))
                 if inv.remarks:
                     lines.append(f"  Remarques: {inv.remarks}")
                 lines.append("")
         
         # High penalty cases
-        high_penalty_invoices = [
-            inv for inv in declaration.invoices
-            if inv.penalty_amount > 1000  # More than 1000 MAD
-        ]
-        
         if high_penalty_invoices:
             lines.append("-" * 80)
             lines.append(f"PÉNALITÉS ÉLEVÉES (> 1000 MAD) - {len(high_penalty_invoices)} cas")
@@ -191,13 +237,17 @@ class ExportService:
             lines.append("")
             
             for inv in high_penalty_invoices:
-                lines.append(f"Facture: {inv.invoice_number or 'N/A'}")
-                lines.append(f"  Fournisseur: {inv.supplier_name or 'N/A'}")
-                lines.append(f"  Montant facture: {inv.invoice_amount_ttc:.2f} MAD")
-                lines.append(f"  Retard: {inv.actual_payment_delay} jours ({inv.months_of_delay} mois)")
-                lines.append(f"  Pénalité: {inv.penalty_amount:.2f} MAD ({inv.penalty_rate:.2f}%)")
+                lines.append(_HIGH_PENALTY_BLOCK.format_map({
+                    "number": inv.invoice_number or 'N/A',
+                    "supplier": inv.supplier_name or 'N/A',
+                    "amount": inv.invoice_amount_ttc,
+                    "days": inv.actual_payment_delay,
+                    "months": inv.months_of_delay,
+                    "penalty": inv.penalty_amount,
+                    "rate": inv.penalty_rate
+                }))
                 if inv.penalty_suspended:
-                    lines.append(f"  ⚠ Pénalité SUSPENDUE")
+                    lines.append("  ⚠ Pénalité SUSPENDUE")
                 lines.append("")
         
         lines.append("=" * 80)
@@ -5,11 +5,12 @@ import logging
 from ..schemas.invoice import InvoiceStruct
 from ..schemas.matching import MatchingResult
 from ..schemas.legal_result import LegalResult, LegalStatus
-from ..schemas.alerts import Alert, AlertCode, AlertSeverity
+from ..schemas.alerts import Alert, AlertCode, ALERT_TEMPLATES, REVIEW_SEVERITIES, alert_with_message
 from ..rules.payment_terms import PaymentTermsEngine
 from ..rules.penalties import PenaltyEngine
 from ..rules.status import StatusEngine
 from ..rules.holiday_calendar import MoroccanHolidayCalendar
+from ..rules.alert_collector import AlertCollector
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,8 @@ class RulesComputationService:
         contractual_delay_days: Optional[int] = None,
         is_disputed: bool = False,
         is_credit_note: bool = False,
-        is_procedure_690: bool = False
+        is_procedure_690: bool = False,
+        as_of_date: Optional[date] = None
     ) -> LegalResult:
         """
         Complete legal computation for a single invoice.
@@ -87,14 +89,16 @@ class RulesComputationService:
             is_disputed: Invoice under legal dispute (Article 78-3)
             is_credit_note: Invoice is a credit note (avoir)
             is_procedure_690: Supplier under Article 690 procedure
+            as_of_date: Reference date for unpaid amounts (default: today)
         
         Returns:
             Complete LegalResult with all DGI-required fields
         """
-        all_alerts = []
-        all_notes = []
+        collector = AlertCollector()
+        invoice_id = invoice.invoice_id
+        today = as_of_date or date.today()
         
-        logger.info(f"Computing legal result for invoice {invoice.invoice_id}")
+        logger.info(f"Computing legal result for invoice {invoice_id}")
         
         # ========================================================================
         # STEP 1: Determine legal status
@@ -105,10 +109,10 @@ class RulesComputationService:
             is_credit_note=is_credit_note,
             is_procedure_690=is_procedure_690
         )
-        all_alerts.extend(status_alerts)
-        all_notes.extend(status_notes)
+        collector.emit_all(status_alerts)
+        collector.note_all(status_notes)
         
-        logger.info(f"Invoice {invoice.invoice_id}: Legal status = {legal_status.value}")
+        logger.info(f"Invoice {invoice_id}: Legal status = {legal_status.value}")
         
         # ========================================================================
         # STEP 2: Compute legal start date (Article 78-2)
@@ -116,12 +120,12 @@ class RulesComputationService:
         legal_start_date, date_alerts = self.payment_terms_engine.compute_legal_start_date(
             invoice=invoice
         )
-        all_alerts.extend(date_alerts)
+        collector.emit_all(date_alerts)
         
         # If no legal start date, cannot continue computation
         if legal_start_date is None:
             logger.error(
-                f"Invoice {invoice.invoice_id}: No legal start date available, "
+                f"Invoice {invoice_id}: No legal start date available, "
                 "cannot compute payment terms"
             )
             return self._create_incomplete_result(
@@ -129,12 +133,12 @@ class RulesComputationService:
                 matching_result=matching_result,
                 legal_status=legal_status,
                 contractual_delay_days=contractual_delay_days,
-                alerts=all_alerts,
-                notes=all_notes
+                alerts=collector.alerts,
+                notes=collector.notes
             )
 
         
-        logger.info(f"Invoice {invoice.invoice_id}: Legal start date = {legal_start_date}")
+        logger.info(f"Invoice {invoice_id}: Legal start date = {legal_start_date}")
         
         # ========================================================================
         # STEP 3: Compute applied legal delay
@@ -142,10 +146,10 @@ class RulesComputationService:
         applied_delay, delay_alerts, delay_notes = self.payment_terms_engine.compute_applied_delay(
             contractual_delay_days=contractual_delay_days
         )
-        all_alerts.extend(delay_alerts)
-        all_notes.extend(delay_notes)
+        collector.emit_all(delay_alerts)
+        collector.note_all(delay_notes)
         
-        logger.info(f"Invoice {invoice.invoice_id}: Applied legal delay = {applied_delay} days")
+        logger.info(f"Invoice {invoice_id}: Applied legal delay = {applied_delay} days")
         
         # ========================================================================
         # STEP 4: Compute legal due date
@@ -154,9 +158,9 @@ class RulesComputationService:
             legal_start_date=legal_start_date,
             delay_days=applied_delay
         )
-        all_notes.extend(due_notes)
+        collector.note_all(due_notes)
         
-        logger.info(f"Invoice {invoice.invoice_id}: Legal due date = {legal_due_date}")
+        logger.info(f"Invoice {invoice_id}: Legal due date = {legal_due_date}")
         
         # ========================================================================
         # STEP 5: Get payment information from matching
@@ -168,27 +172,28 @@ class RulesComputationService:
         )
         
         if payment_date:
-            logger.info(f"Invoice {invoice.invoice_id}: Payment date = {payment_date}")
+            logger.info(f"Invoice {invoice_id}: Payment date = {payment_date}")
         else:
-            logger.info(f"Invoice {invoice.invoice_id}: UNPAID")
+            logger.info(f"Invoice {invoice_id}: UNPAID")
         
         # Validate payment coherence
         payment_alerts = self.status_engine.check_payment_validity(
             invoice=invoice,
             payment_date=payment_date
         )
-        all_alerts.extend(payment_alerts)
+        collector.emit_all(payment_alerts)
         
         # ========================================================================
         # STEP 6: Compute days overdue (calendar days)
         # ========================================================================
         days_overdue, overdue_alerts = self.payment_terms_engine.compute_days_overdue(
             due_date=legal_due_date,
-            payment_date=payment_date
+            payment_date=payment_date,
+            as_of_date=today
         )
-        all_alerts.extend(overdue_alerts)
+        collector.emit_all(overdue_alerts)
         
-        logger.info(f"Invoice {invoice.invoice_id}: Days overdue = {days_overdue}")
+        logger.info(f"Invoice {invoice_id}: Days overdue = {days_overdue}")
         
         # ========================================================================
         # STEP 7: Compute amounts
@@ -198,21 +203,14 @@ class RulesComputationService:
         unpaid_amount = max(0, invoice_amount - paid_amount)
         
         logger.info(
-            f"Invoice {invoice.invoice_id}: "
+            f"Invoice {invoice_id}: "
             f"Amount={invoice_amount:.2f}, Paid={paid_amount:.2f}, "
             f"Unpaid={unpaid_amount:.2f} MAD"
         )
         
         # Add alert for partial payment
         if 0 < unpaid_amount < invoice_amount:
-            all_alerts.append(Alert(
-                code=AlertCode.PARTIAL_PAYMENT_DETECTED,
-                severity=AlertSeverity.INFO,
-                message=(
-                    f"Paiement partiel détecté: "
-                ),
-                field="matching"
-            ))
+            collector.emit(ALERT_TEMPLATES[AlertCode.PARTIAL_PAYMENT_DETECTED])
         
         # ========================================================================
         # STEP 8: Compute penalty (CRITICAL - DGI calendar month logic)
@@ -220,8 +218,7 @@ class RulesComputationService:
         
         # CRITICAL: For any unpaid amount (partial or full), penalties accrue until TODAY
         # For fully paid invoices, use the actual payment date
-        from datetime import date as date_type
-        effective_date = date_type.today() if unpaid_amount > 0 else payment_date
+        effective_date = today if unpaid_amount > 0 else payment_date
         
         # Flag for logging purposes
         has_partial_payment = (paid_amount > 0 and unpaid_amount > 0)
@@ -232,27 +229,27 @@ class RulesComputationService:
             due_date=legal_due_date,
             payment_date=effective_date
         )
-        all_notes.extend(months_notes)
+        collector.note_all(months_notes)
         
         if has_partial_payment:
-            all_notes.append(
+            collector.note(
                 f"⚠️ Paiement partiel détecté: pénalités calculées jusqu'à aujourd'hui "
-                f"({date_type.today().isoformat()}) pour le montant impayé ({unpaid_amount:.2f} MAD)"
+                f"({today.isoformat()}) pour le montant impayé ({unpaid_amount:.2f} MAD)"
             )
         elif is_fully_unpaid:
-            all_notes.append(
+            collector.note(
                 f"⚠️ Facture non payée: pénalités calculées jusqu'à aujourd'hui "
-                f"({date_type.today().isoformat()}) pour le montant total ({unpaid_amount:.2f} MAD)"
+                f"({today.isoformat()}) pour le montant total ({unpaid_amount:.2f} MAD)"
             )
         
         logger.info(
-            f"Invoice {invoice.invoice_id}: "
+            f"Invoice {invoice_id}: "
             f"Months of delay = {months_of_delay} (DGI calendar method)"
         )
         
         # 8.2: Compute penalty rate
         penalty_rate, rate_notes = self.penalty_engine.compute_penalty_rate(months_of_delay)
-        all_notes.extend(rate_notes)
+        collector.note_all(rate_notes)
         
         # 8.3: Compute penalty amount (DGI rule: penalties on invoice amount for late full payments)
         penalty_amount, amount_notes = self.penalty_engine.compute_penalty_amount(
@@ -261,12 +258,12 @@ class RulesComputationService:
             invoice_amount=invoice_amount,
             months_of_delay=months_of_delay
         )
-        all_notes.extend(amount_notes)
+        collector.note_all(amount_notes)
         
         base_penalty_amount = penalty_amount
         
         logger.info(
-            f"Invoice {invoice.invoice_id}: "
+            f"Invoice {invoice_id}: "
             f"Base penalty = {base_penalty_amount:.2f} MAD ({penalty_rate:.2f}%)"
         )
         
@@ -278,11 +275,11 @@ class RulesComputationService:
                 legal_status=legal_status,
                 base_penalty_amount=base_penalty_amount
             )
-        all_notes.extend(status_penalty_notes)
+        collector.note_all(status_penalty_notes)
         
         if penalty_suspended:
             logger.warning(
-                f"Invoice {invoice.invoice_id}: "
+                f"Invoice {invoice_id}: "
                 f"Penalty SUSPENDED ({legal_status.value}), "
                 f"calculated amount: {base_penalty_amount:.2f} MAD"
             )
@@ -293,17 +290,13 @@ class RulesComputationService:
         if matching_result.matches:
             best_match = matching_result.matches[0]
             if best_match.confidence_score < 80:
-                all_alerts.append(Alert(
-                    code=AlertCode.LOW_CONFIDENCE_MATCH,
-                    severity=AlertSeverity.WARNING,
-                    message=(
-                        f"Confiance de matching faible: {best_match.confidence_score:.0f}%. "
-                        "Validation manuelle recommandée."
-                    ),
-                    field="matching"
+                collector.emit(alert_with_message(
+                    AlertCode.LOW_CONFIDENCE_MATCH,
+                    f"Confiance de matching faible: {best_match.confidence_score:.0f}%. "
+                    "Validation manuelle recommandée."
                 ))
                 logger.warning(
-                    f"Invoice {invoice.invoice_id}: "
+                    f"Invoice {invoice_id}: "
                     f"Low matching confidence: {best_match.confidence_score:.0f}%"
                 )
         
@@ -311,14 +304,14 @@ class RulesComputationService:
         # STEP 11: Determine if manual review is required
         # ========================================================================
         requires_manual_review = any(
-            alert.severity in (AlertSeverity.WARNING, AlertSeverity.ERROR, AlertSeverity.CRITICAL)
-            for alert in all_alerts
+            alert.severity in REVIEW_SEVERITIES
+            for alert in collector.alerts
         )
         
         if requires_manual_review:
             logger.warning(
-                f"Invoice {invoice.invoice_id}: "
-                f"REQUIRES MANUAL REVIEW ({len(all_alerts)} alerts)"
+                f"Invoice {invoice_id}: "
+                f"REQUIRES MANUAL REVIEW ({len(collector.alerts)} alerts)"
             )
         
         # ========================================================================
@@ -373,7 +366,7 @@ class RulesComputationService:
         # STEP 13: Build final result
         # ========================================================================
         result = LegalResult(
-            invoice_id=invoice.invoice_id,
+            invoice_id=invoice_id,
             legal_start_date=legal_start_date,
             legal_due_date=legal_due_date,
             contractual_delay_days=contractual_delay_days,
@@ -388,24 +381,86 @@ class RulesComputationService:
             invoice_amount_ttc=invoice_amount,
             paid_amount=paid_amount,
             unpaid_amount=unpaid_amount,
-            alerts=all_alerts,
-            computation_notes=all_notes,
+            alerts=collector.alerts,
+            computation_notes=collector.notes,
             calculation_breakdown=calculation_breakdown,
             requires_manual_review=requires_manual_review
         )
         
         # Final summary log
         logger.info(
-            f"✓ Invoice {invoice.invoice_id} computation complete: "
+            f"✓ Invoice {invoice_id} computation complete: "
             f"Status={legal_status.value}, "
             f"Delay={days_overdue}d ({months_of_delay}m), "
             f"Penalty={final_penalty_amount:.2f} MAD, "
-            f"Alerts={len(all_alerts)}, "
+            f"Alerts={len(collector.alerts)}, "
             f"Review={'YES' if requires_manual_review else 'NO'}"
         )
         
         return result
     
+    def compute_legal_results_batch(
+        self,
+        invoices: List[InvoiceStruct],
+        matching_results: List[MatchingResult],
+        contractual_delays: Optional[List[Optional[int]]] = None,
+        disputed_invoice_ids: Optional[List[str]] = None,
+        credit_note_ids: Optional[List[str]] = None,
+        procedure_690_ices: Optional[List[str]] = None
+    ) -> List[LegalResult]:
+        """
+        Legal computation for a batch of invoices.
+        
+        Per-batch work (flag lookups, default delays, bound methods) is done
+        once up front; each invoice then goes through the same pipeline as
+        compute_legal_result so results are identical to single calls.
+        
+        Args:
+            invoices: Invoice structures
+            matching_results: Matching results (same order as invoices)
+            contractual_delays: Contractual delay per invoice (None = default)
+            disputed_invoice_ids: IDs of invoices under legal dispute
+            credit_note_ids: IDs of invoices that are credit notes
+            procedure_690_ices: ICEs of suppliers under Article 690 procedure
+        
+        Returns:
+            List of LegalResult, in invoice order
+        """
+        count = len(invoices)
+        if contractual_delays is None:
+            contractual_delays = [None] * count
+        
+        disputed_set = frozenset(disputed_invoice_ids or ())
+        credit_note_set = frozenset(credit_note_ids or ())
+        procedure_690_set = frozenset(procedure_690_ices or ())
+        
+        # Flag columns computed in one pass each, outside the per-invoice loop
+        invoice_ids = [invoice.invoice_id for invoice in invoices]
+        supplier_ices = [invoice.supplier.ice or "" for invoice in invoices]
+        disputed_flags = [invoice_id in disputed_set for invoice_id in invoice_ids] if disputed_set else [False] * count
+        credit_note_flags = [invoice_id in credit_note_set for invoice_id in invoice_ids] if credit_note_set else [False] * count
+        procedure_690_flags = [ice in procedure_690_set for ice in supplier_ices] if procedure_690_set else [False] * count
+        
+        # One reference date for the whole batch (deterministic across midnight)
+        today = date.today()
+        
+        compute = self.compute_legal_result
+        return [
+            compute(
+                invoice=invoice,
+                matching_result=matching,
+                contractual_delay_days=contractual_delay,
+                is_disputed=is_disputed,
+                is_credit_note=is_credit_note,
+                is_procedure_690=is_procedure_690,
+                as_of_date=today
+            )
+            for invoice, matching, contractual_delay, is_disputed, is_credit_note, is_procedure_690 in zip(
+                invoices, matching_results, contractual_delays,
+                disputed_flags, credit_note_flags, procedure_690_flags
+            )
+        ]
+    
     def _create_incomplete_result(
         self,
         invoice: InvoiceStruct,
@@ -1,4 +1,5 @@
 from .config import config
+from .rate_limit import TokenBucketLimiter
 from .validators import (
     validate_ice,
     validate_rc,
@@ -8,6 +9,7 @@ from .validators import (
 
 __all__ = [
     "config",
+    "TokenBucketLimiter",
     "validate_ice",
     "validate_rc",
     "validate_amount",
@@ -23,6 +23,24 @@ class Config:
     PENALTY_BASE_RATE = float(os.getenv("PENALTY_BASE_RATE", "2.25"))
     PENALTY_MONTHLY_INCREMENT = float(os.getenv("PENALTY_MONTHLY_INCREMENT", "0.85"))
 
+    # Worker threads for blocking LLM extraction calls (keep in line with API rate limits)
+    EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", "16"))
+    # Concurrent LLM calls per /extract/batch request
+    EXTRACT_BATCH_CONCURRENCY = int(os.getenv("EXTRACT_BATCH_CONCURRENCY", "20"))
+    # Extraction results kept for re-submitted documents (0 disables the cache)
+    EXTRACT_CACHE_SIZE = int(os.getenv("EXTRACT_CACHE_SIZE", "1024"))
+    # SQLite file persisting extraction results across restarts (empty disables)
+    EXTRACT_DISK_CACHE_PATH = os.getenv("EXTRACT_DISK_CACHE_PATH", "")
+    EXTRACT_DISK_CACHE_TTL_SECONDS = int(os.getenv("EXTRACT_DISK_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    # Regex pre-pass for single-transfer bank statements (skips the LLM call).
+    # Off by default: it never reads the payment reference the matcher scores on
+    EXTRACT_PAYMENT_FAST_PATH = os.getenv("EXTRACT_PAYMENT_FAST_PATH", "false").lower() == "true"
+    # Drop OCR lines far from keywords/dates/amounts before prompting the LLM
+    EXTRACT_OCR_PREFILTER = os.getenv("EXTRACT_OCR_PREFILTER", "true").lower() == "true"
+    # Anthropic tier limits shared by all extraction calls (0 disables the limiter)
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_INPUT_TOKENS_PER_MINUTE = int(os.getenv("LLM_INPUT_TOKENS_PER_MINUTE", "0"))
+
     def __init__(self):
         """Validate configuration on initialization."""
         self._validate()
@@ -0,0 +1,62 @@
+from typing import Optional
+import asyncio
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """
+    Shared request/token budget in front of the LLM API.
+
+    Two buckets refill continuously at their per-minute limits: one for
+    requests, one for estimated input tokens. Each call reserves its cost up
+    front (a bucket may go negative) and then waits until the reservation is
+    covered, so concurrent callers are spaced out instead of all hitting the
+    rate limit and backing off together. Safe across threads and event loops.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: Optional[int] = None):
+        """
+        Args:
+            requests_per_minute: Request budget (RPM tier limit)
+            tokens_per_minute: Input token budget (ITPM tier limit), None for no token limit
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._updated = time.monotonic()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute or 0)
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and `tokens` from the buckets; seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+
+            request_rate = self.requests_per_minute / 60.0
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * request_rate) - 1
+            wait = -self._requests / request_rate if self._requests < 0 else 0.0
+
+            if self.tokens_per_minute:
+                token_rate = self.tokens_per_minute / 60.0
+                # A single oversized call can't need more than a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * token_rate) - tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / token_rate)
+
+            return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Blocking acquire (worker threads)."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async acquire: sleeps without blocking the event loop."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
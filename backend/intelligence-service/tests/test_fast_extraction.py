@@ -0,0 +1,51 @@
+from datetime import date
+
+from app.modules.fast_extraction import FastPaymentExtractor
+
+
+def _statement(op: str, value: str) -> str:
+    return (
+        "RELEVE DE COMPTE MAD\n"
+        f"0016BK {op} VIR.EMIS WEB VERS ARIHA SERVICE SAR {value} 6 300,00\n"
+    )
+
+
+def test_operation_date_same_year():
+    result = FastPaymentExtractor().extract(_statement("28 02", "03 03 2025"))
+
+    assert result.dates.operation_date == date(2025, 2, 28)
+    assert result.dates.value_date == date(2025, 3, 3)
+    assert result.amount.value == 6300.0
+
+
+def test_operation_in_december_value_in_january():
+    result = FastPaymentExtractor().extract(_statement("31 12", "02 01 2025"))
+
+    assert result.dates.operation_date == date(2024, 12, 31)
+    assert result.dates.value_date == date(2025, 1, 2)
+
+
+def test_operation_in_january_value_in_december():
+    result = FastPaymentExtractor().extract(_statement("02 01", "31 12 2024"))
+
+    assert result.dates.operation_date == date(2025, 1, 2)
+    assert result.dates.value_date == date(2024, 12, 31)
+
+
+def test_balance_column_falls_back_to_llm():
+    text = (
+        "RELEVE DE COMPTE MAD\n"
+        "0016BK 28 08 VIR.EMIS WEB VERS ARIHA SERVICE SAR 27 08 2025 6 300,00 125 430,50\n"
+    )
+
+    assert FastPaymentExtractor().extract(text) is None
+
+
+def test_reference_after_value_date_falls_back_to_llm():
+    for reference in ("REF 455", "FACT 2025/118"):
+        text = (
+            "RELEVE DE COMPTE MAD\n"
+            f"0016BK 28 08 VIR.EMIS WEB VERS ARIHA SERVICE SAR 27 08 2025 {reference} 6 300,00\n"
+        )
+
+        assert FastPaymentExtractor().extract(text) is None
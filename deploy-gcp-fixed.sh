@@ -144,6 +144,7 @@ CREATE TABLE users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_login TIMESTAMP
 );
+CREATE UNIQUE INDEX ix_users_email_lower ON users (LOWER(email));
 
 -- BATCHES TABLE
 CREATE TABLE batches (